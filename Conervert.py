@@ -1,22 +1,25 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk, ImageEnhance, ImageDraw, ImageFont, ImageFilter
-import numpy as np
+from collections import deque
+from PIL import Image, ImageTk
 import threading
 import os
-import json
+import time
 
+from asciiconverter import (
+    CHARS, Cancelled, DITHERS, PALETTES, StageCache, DiskCache, file_digest, open_draftable, open_image, extract_gif_frames, convert_frame, convert_frames, shared_palette,
+    frame_runs, make_static_html, make_compact_html, rows_to_image, load_font, measure_font,
+    frame_to_ansi, ansi_stream, ANSI_RESET, PROFILE, profiled,
+)
 
-CHARS = {
-    "Standard": list(' .\'`^",:;Il!i><~+_-?][}{1)(|\\/tfjrxnuvczXYUJCLQ0OZmwqpdbkhao*#MW&8%B@$'),
-    "Dense":    list('@#S%?*+;:,. '),
-    "Sparse":   list(' .-:=+*#%@'),
-    "Blocks":   list(' ░▒▓█'),
-    "Braille":  list(' ⠁⠂⠃⠄⠅⠆⠇⠈⠉⠊⠋⠌⠍⠎⠏⠐⠑⠒⠓⠔⠕⠖⠗⠘⠙⠚⠛⠜⠝⠞⠟⠠⠡⠢⠣⠤⠥⠦⠧⠨⠩⠪⠫⠬⠭⠮⠯⠰⠱⠲⠳⠴⠵⠶⠷⠸⠹⠺⠻⠼⠽⠾⠿'),
-    "Minimal":  list(' :. #'),
-}
 
-HALF_BLOCK = "▀"
+PREVIEW_DEBOUNCE_MS = 150   # live preview waits this long after the last slider event
+PREVIEW_DRAFT_WIDTH = 48    # live preview first shows a draft this wide, then refines
+TAG_LIMIT  = 20000   # Text widget color tags kept alive across frames before a purge
+RENDER_FPS_TARGET = 30
+PROGRESS_HZ = 15     # worker threads post progress to Tk at most this often
+VIEW_MARGIN = 40     # rows drawn above and below the visible part of the output
+BITMAP_BUDGET = 384 << 20   # bitmap playback is refused past this much pre-rendered image data
 
 BG   = '#0d0d0d'
 PANEL= '#141414'
@@ -30,198 +33,6 @@ BTN  = '#1e1e1e'
 INBG = '#111111'
 
 
-def to_hex(r, g, b):
-    return f'#{int(r):02x}{int(g):02x}{int(b):02x}'
-
-
-def extract_gif_frames(gif):
-    frames = []
-    bg = Image.new('RGBA', gif.size, (0, 0, 0, 255))
-    i = 0
-    while True:
-        try:
-            gif.seek(i)
-        except EOFError:
-            break
-        frame = gif.copy().convert('RGBA')
-        dur = gif.info.get('duration', 100) or 100
-        comp = bg.copy()
-        comp.paste(frame, (0, 0), frame)
-        frames.append((comp.convert('RGB'), dur))
-        disposal = getattr(gif, 'disposal_method', 0)
-        bg = Image.new('RGBA', gif.size, (0, 0, 0, 255)) if disposal == 2 else comp
-        i += 1
-    return frames
-
-
-def px_to_char(val, chars):
-    idx = int(val / 255 * (len(chars) - 1))
-    return chars[max(0, min(idx, len(chars) - 1))]
-
-
-def floyd_steinberg(px):
-    arr = px.astype(float)
-    h, w = arr.shape
-    for y in range(h):
-        for x in range(w):
-            old = arr[y, x]
-            new = round(old / 255) * 255
-            arr[y, x] = new
-            err = old - new
-            if x+1 < w:           arr[y, x+1]   += err * 7/16
-            if y+1 < h:
-                if x-1 >= 0:      arr[y+1, x-1] += err * 3/16
-                arr[y+1, x]       += err * 5/16
-                if x+1 < w:       arr[y+1, x+1] += err * 1/16
-    return np.clip(arr, 0, 255).astype(np.uint8)
-
-
-def convert_frame(img, mode, width, chars, brightness, contrast, saturation, invert, dither, edge, prog_cb=None):
-    img = img.copy()
-
-    if saturation != 1.0:
-        img = ImageEnhance.Color(img.convert('RGB')).enhance(saturation)
-
-    aspect = img.size[1] / img.size[0]
-
-    if mode == 'halfblock':
-        raw_h = max(2, int(width * aspect))
-        if raw_h % 2: raw_h += 1
-        img = img.resize((width, raw_h), Image.Resampling.LANCZOS).convert('RGB')
-        img = ImageEnhance.Brightness(img).enhance(brightness)
-        img = ImageEnhance.Contrast(img).enhance(contrast)
-        px = np.array(img)
-        if invert: px = 255 - px
-        rows = []
-        total = raw_h // 2
-        for i in range(0, raw_h - 1, 2):
-            row = [(HALF_BLOCK, to_hex(*px[i][j]), to_hex(*px[i+1][j])) for j in range(width)]
-            rows.append(row)
-            if prog_cb: prog_cb(int((i//2+1)/total*100))
-        return rows
-
-    h = max(1, int(width * aspect * 0.55))
-    img = img.resize((width, h), Image.Resampling.LANCZOS)
-
-    edge_filters = {'soft': ImageFilter.SMOOTH, 'hard': ImageFilter.SHARPEN, 'find': ImageFilter.FIND_EDGES}
-    if edge in edge_filters:
-        img = img.filter(edge_filters[edge])
-
-    img = ImageEnhance.Brightness(img).enhance(brightness)
-    img = ImageEnhance.Contrast(img).enhance(contrast)
-
-    if mode == 'grayscale':
-        img = img.convert('L')
-        px = np.array(img)
-        if invert: px = 255 - px
-        if dither: px = floyd_steinberg(px)
-        rows = []
-        for i, row in enumerate(px):
-            rows.append(''.join(px_to_char(p, chars) for p in row))
-            if prog_cb and (i % 5 == 0 or i == len(px)-1):
-                prog_cb(int((i+1)/len(px)*100))
-        return rows
-
-    # color mode
-    img = img.convert('RGB')
-    gray = img.convert('L')
-    gray = ImageEnhance.Contrast(gray).enhance(1.0)  # already done above but gray needs separate pass
-    cpx = np.array(img)
-    gpx = np.array(gray)
-    if invert:
-        cpx = 255 - cpx
-        gpx = 255 - gpx
-    rows = []
-    for i, (grow, crow) in enumerate(zip(gpx, cpx)):
-        rows.append([(px_to_char(g, chars), to_hex(*c)) for g, c in zip(grow, crow)])
-        if prog_cb and (i % 5 == 0 or i == len(gpx)-1):
-            prog_cb(int((i+1)/len(gpx)*100))
-    return rows
-
-
-def frame_to_html(rows, mode):
-    lines = []
-    def esc(c): return c.replace('&','&amp;').replace('<','&lt;').replace('>','&gt;')
-    if mode == 'grayscale':
-        for row in rows: lines.append(esc(row))
-    elif mode == 'color':
-        for row in rows:
-            lines.append(''.join(f'<span style="color:{col}">{esc(ch)}</span>' for ch, col in row))
-    elif mode == 'halfblock':
-        for row in rows:
-            lines.append(''.join(f'<span style="color:{fg};background:{bg}">{HALF_BLOCK}</span>' for _, fg, bg in row))
-    return '\n'.join(lines)
-
-
-def make_static_html(rows, mode, fontsize=10, bg='#000000'):
-    body = frame_to_html(rows, mode)
-    return f'''<!DOCTYPE html><html><head><meta charset="utf-8"><title>ASCII Art</title>
-<style>body{{background:{bg};margin:0;padding:16px}}
-pre{{font-family:"Courier New",monospace;font-size:{fontsize}px;line-height:1.2;margin:0}}
-span{{display:inline}}</style></head><body><pre>{body}</pre></body></html>'''
-
-
-def make_animated_html(all_rows, durations, mode, fontsize=10, bg='#000000'):
-    fdata = json.dumps([frame_to_html(r, mode) for r in all_rows])
-    ddata = json.dumps(durations)
-    return f'''<!DOCTYPE html><html><head><meta charset="utf-8"><title>ASCII GIF</title>
-<style>
-body{{background:{bg};margin:0;padding:16px;user-select:none}}
-pre{{font-family:"Courier New",monospace;font-size:{fontsize}px;line-height:1.2;margin:0;white-space:pre}}
-span{{display:inline}}
-#bar{{position:fixed;bottom:10px;left:50%;transform:translateX(-50%);
-      background:rgba(0,0,0,.8);border-radius:8px;padding:6px 14px;
-      display:flex;gap:10px;align-items:center;color:#00ff88;font-family:monospace;font-size:13px}}
-button{{background:#1e1e1e;color:#00ff88;border:1px solid #333;border-radius:4px;
-        padding:2px 9px;cursor:pointer;font-size:13px}}
-button:hover{{background:#2a2a2a}}
-input[type=range]{{accent-color:#00ff88}}
-</style></head><body>
-<pre id="out"></pre>
-<div id="bar">
-  <button id="btn">⏸</button>
-  frame <input type="range" id="scrub" min="0" value="0" style="width:150px">
-  <span id="info">1/1</span>
-  speed <input type="range" id="spd" min="10" max="400" value="100" style="width:80px">
-  <span id="sl">100%</span>
-</div>
-<script>
-const frames={fdata}, dur={ddata};
-const out=document.getElementById('out'), btn=document.getElementById('btn'),
-      scrub=document.getElementById('scrub'), info=document.getElementById('info'),
-      spd=document.getElementById('spd'), sl=document.getElementById('sl');
-scrub.max=frames.length-1;
-let idx=0, playing=true, t=null;
-const show=i=>{{ out.innerHTML=frames[i]; scrub.value=i; info.textContent=(i+1)+'/'+frames.length; }};
-const next=()=>{{ idx=(idx+1)%frames.length; show(idx); t=setTimeout(next, Math.max(16, dur[idx]*(100/+spd.value))); }};
-btn.onclick=()=>{{ playing=!playing; btn.textContent=playing?'⏸':'▶'; playing?next():clearTimeout(t); }};
-scrub.oninput=()=>{{ clearTimeout(t); idx=+scrub.value; show(idx); if(playing) next(); }};
-spd.oninput=()=>sl.textContent=spd.value+'%';
-show(0); next();
-</script></body></html>'''
-
-
-def rows_to_image(rows, mode, fnt, cw, ch):
-    ncols = max((len(r) for r in rows), default=1)
-    img = Image.new('RGB', (ncols * cw, len(rows) * ch), 'black')
-    draw = ImageDraw.Draw(img)
-    if mode == 'grayscale':
-        for ri, row in enumerate(rows):
-            draw.text((0, ri*ch), row, font=fnt, fill='white')
-    elif mode == 'color':
-        for ri, row in enumerate(rows):
-            x = 0
-            for ch_, col in row:
-                draw.text((x, ri*ch), ch_, font=fnt, fill=col); x += cw
-    elif mode == 'halfblock':
-        for ri, row in enumerate(rows):
-            x = 0
-            for _, fg, bg in row:
-                draw.rectangle([x, ri*ch, x+cw-1, ri*ch+ch-1], fill=bg)
-                draw.text((x, ri*ch), HALF_BLOCK, font=fnt, fill=fg); x += cw
-    return img
-
-
 class App:
     def __init__(self, root):
         self.root = root
@@ -233,23 +44,40 @@ class App:
         # image state
         self.img = None           # current PIL image (first frame for GIFs)
         self.img_path = None
-        self.result = None        # (mode, rows) for static images
+        self.img_key = None       # (path, mtime, size): identifies self.img in the stage cache
+        self.stages = StageCache()  # resized/filtered/toned arrays reused across conversions
+        self.img_digest = None    # hash of the file's bytes, computed on the first convert
+        try: self.disk_cache = DiskCache()
+        except OSError: self.disk_cache = None
+        self.result = None        # ConvertedFrame for static images
 
         # gif state
         self.is_gif = False
-        self.gif_frames = []      # list of (PIL img, duration ms)
-        self.gif_converted = []   # list of rows per frame
-        self.gif_durations = []
-        self.gif_mode = 'color'
+        self.gif_count = 0        # frames are decoded on demand from img_path
+        self.gif_converted = []   # list of ConvertedFrame per frame
+        self.gif_durations = []   # filled in as frames are decoded for conversion
         self.playing = False
         self.anim_idx = 0
         self.anim_job = None
-        self.gif_thumb_photos = []
+        self.gif_thumb_iter = None
         self.gif_thumb_job = None
-        self.gif_thumb_idx = 0
+        self.play_due = 0.0       # perf_counter time the current frame's slot starts
+        self.play_times = deque(maxlen=60)   # when recent frames were drawn, for the achieved fps
+        self.play_skipped = 0
+        self.bitmaps = {}         # id(ConvertedFrame) -> PhotoImage for canvas playback
+        self.bitmap_gen = 0
+        self.canvas_on = False
+        self.prof_job = None
 
         self.converting = False
+        self.cancel_evt = threading.Event()
+        self.preview_gen = 0      # bumped on every change; preview results from older generations are dropped
+        self.preview_job = None
+        self._buttons = None
         self.tags = set()
+        self.shown = None         # frame in the output widget; only view_rows of it are drawn
+        self.view_rows = (0, 0)
+        self.view_job = None
 
         # vars
         self.v_width      = tk.IntVar(value=120)
@@ -257,22 +85,26 @@ class App:
         self.v_contrast   = tk.DoubleVar(value=1.1)
         self.v_sat        = tk.DoubleVar(value=1.2)
         self.v_invert     = tk.BooleanVar(value=False)
-        self.v_dither     = tk.BooleanVar(value=False)
+        self.v_dither     = tk.StringVar(value="off")
         self.v_live       = tk.BooleanVar(value=False)
         self.v_loop       = tk.BooleanVar(value=True)
         self.v_charset    = tk.StringVar(value="Standard")
         self.v_mode       = tk.StringVar(value="color")
         self.v_edge       = tk.StringVar(value="off")
+        self.v_palette    = tk.StringVar(value="off")
         self.v_fontsize   = tk.IntVar(value=9)
         self.v_custom     = tk.StringVar(value="")
         self.v_progress   = tk.IntVar(value=0)
         self.v_status     = tk.StringVar(value="Load an image or GIF to get started")
         self.v_speed      = tk.IntVar(value=100)
         self.v_frame      = tk.IntVar(value=0)
+        self.v_bitmap     = tk.BooleanVar(value=False)
+        self.v_workers    = tk.IntVar(value=os.cpu_count() or 1)
 
         self._style()
         self._ui()
         self._shortcuts()
+        self._cache_stats()
 
     def _style(self):
         s = ttk.Style()
@@ -312,6 +144,7 @@ class App:
             ("↺ Reset",        self.reset,          'TButton'),
             ("🖼 PNG",          self.export_png,     'TButton'),
             ("🌐 HTML",         self.export_html,    'TButton'),
+            ("▤ ANSI",          self.export_ansi,    'TButton'),
             ("💾 Save",         self.save_txt,       'TButton'),
             ("⎘ Copy",          self.copy,           'TButton'),
             ("▶ Convert",       self.convert,        'TButton'),
@@ -338,11 +171,20 @@ class App:
         self._divider(sb, "RENDER MODE")
         mf = tk.Frame(sb, bg=CARD)
         mf.pack(fill=tk.X, padx=2, pady=1)
-        for text, val in [("🎨 Color", "color"), ("◐ Half-Block HD", "halfblock"), ("▓ Grayscale", "grayscale")]:
+        for text, val in [("🎨 Color", "color"), ("◐ Half-Block HD", "halfblock"), ("▓ Grayscale", "grayscale"),
+                          ("⣿ Braille", "braille"), ("⠿ Braille Mono", "braille mono"),
+                          ("◇ Structure", "structure"), ("◆ Structure Mono", "structure mono")]:
             ttk.Radiobutton(mf, text=text, variable=self.v_mode,
                             value=val, command=self._live).pack(anchor='w', padx=8, pady=2)
-        tk.Label(mf, text="Half-block uses ▀ — doubles vertical resolution.",
+        tk.Label(mf, text="Half-block uses ▀ — doubles vertical resolution.\n"
+                          "Braille packs 2×4 dots per char (charset ignored).\n"
+                          "Structure picks glyphs by shape, not just tone.",
                  bg=CARD, fg=DIM, font=('Consolas', 7), justify='left').pack(anchor='w', padx=8, pady=(0,4))
+        tk.Label(mf, text="Palette (color / half-block):", bg=CARD, fg=DIM, font=('Consolas', 8)).pack(anchor='w', padx=8)
+        pc = ttk.Combobox(mf, values=PALETTES,
+                          textvariable=self.v_palette, state='readonly', width=14)
+        pc.pack(padx=8, pady=(0,4))
+        pc.bind("<<ComboboxSelected>>", self._live)
 
         self._divider(sb, "CHARACTERS")
         cf = tk.Frame(sb, bg=CARD)
@@ -369,8 +211,7 @@ class App:
         of = tk.Frame(sb, bg=CARD)
         of.pack(fill=tk.X, padx=2, pady=1)
         ttk.Checkbutton(of, text="Invert",        variable=self.v_invert, command=self._live).pack(anchor='w', padx=8, pady=2)
-        ttk.Checkbutton(of, text="Dither (F-S)",  variable=self.v_dither, command=self._live).pack(anchor='w', padx=8, pady=2)
-        ttk.Checkbutton(of, text="Live Preview",  variable=self.v_live).pack(anchor='w', padx=8, pady=2)
+        ttk.Checkbutton(of, text="Live Preview",  variable=self.v_live, command=self._live).pack(anchor='w', padx=8, pady=2)
 
         tk.Label(of, text="Edge:", bg=CARD, fg=DIM, font=('Consolas', 8)).pack(anchor='w', padx=8, pady=(4,0))
         ec = ttk.Combobox(of, values=['off','soft','hard','find'],
@@ -378,12 +219,22 @@ class App:
         ec.pack(padx=8, pady=(0,4))
         ec.bind("<<ComboboxSelected>>", self._live)
 
+        tk.Label(of, text="Dither (grayscale / braille):", bg=CARD, fg=DIM, font=('Consolas', 8)).pack(anchor='w', padx=8)
+        dc = ttk.Combobox(of, values=DITHERS,
+                          textvariable=self.v_dither, state='readonly', width=14)
+        dc.pack(padx=8, pady=(0,4))
+        dc.bind("<<ComboboxSelected>>", self._live)
+
         tk.Label(of, text="Font size:", bg=CARD, fg=DIM, font=('Consolas', 8)).pack(anchor='w', padx=8)
         sp = ttk.Spinbox(of, from_=5, to=24, increment=1, textvariable=self.v_fontsize,
                          width=6, command=self._apply_fontsize)
         sp.pack(anchor='w', padx=8, pady=(0,6))
         sp.bind('<Return>', lambda e: self._apply_fontsize())
 
+        tk.Label(of, text="GIF workers:", bg=CARD, fg=DIM, font=('Consolas', 8)).pack(anchor='w', padx=8)
+        ttk.Spinbox(of, from_=1, to=max(1, os.cpu_count() or 1), increment=1,
+                    textvariable=self.v_workers, width=6).pack(anchor='w', padx=8, pady=(0,6))
+
     def _output(self, parent):
         right = tk.Frame(parent, bg=BG)
         right.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -410,9 +261,14 @@ class App:
                            relief='flat', bd=4, cursor='arrow')
         self.out.pack(fill=tk.BOTH, expand=True, pady=(2,0))
 
-        ys = ttk.Scrollbar(right, orient='vertical',   command=self.out.yview)
-        xs = ttk.Scrollbar(right, orient='horizontal', command=self.out.xview)
-        self.out.configure(yscrollcommand=ys.set, xscrollcommand=xs.set)
+        # bitmap playback: pre-rendered frames blitted onto a canvas that takes the Text's place
+        self.canvas = tk.Canvas(right, bg=INBG, highlightthickness=0, bd=0)
+        self.canvas_img = self.canvas.create_image(4, 4, anchor='nw')
+
+        self.ys = ys = ttk.Scrollbar(right, orient='vertical', command=self.out.yview)
+        self.xs = xs = ttk.Scrollbar(right, orient='horizontal', command=self.out.xview)
+        # rows are drawn full width, so only vertical moves (wheel, keys, scrollbar, zoom) need a refill
+        self.out.configure(yscrollcommand=self._on_yscroll, xscrollcommand=xs.set)
         ys.place(relx=1.0, rely=0,   relheight=1.0, anchor='ne')
         xs.place(relx=0,   rely=1.0, relwidth=1.0,  anchor='sw')
 
@@ -449,6 +305,11 @@ class App:
         tk.Checkbutton(bar, text="loop", variable=self.v_loop, bg=PANEL, fg=FG,
                        font=('Consolas', 8), selectcolor=INBG,
                        activebackground=PANEL).pack(side=tk.LEFT, padx=6)
+        tk.Checkbutton(bar, text="bitmap", variable=self.v_bitmap, bg=PANEL, fg=FG,
+                       font=('Consolas', 8), selectcolor=INBG, activebackground=PANEL,
+                       command=self._toggle_bitmap).pack(side=tk.LEFT, padx=2)
+        self.fps_lbl = tk.Label(bar, text="", bg=PANEL, fg=DIM, font=('Consolas', 8))
+        self.fps_lbl.pack(side=tk.LEFT, padx=6)
 
     def _statusbar(self):
         bar = tk.Frame(self.root, bg=PANEL, height=26)
@@ -457,10 +318,62 @@ class App:
         self.progress = ttk.Progressbar(bar, orient='horizontal', mode='determinate',
                                         variable=self.v_progress, length=180)
         self.progress.pack(side=tk.LEFT, padx=8, pady=5)
+        self.cancel_btn = tk.Button(bar, text="✕", bg=PANEL, fg=DIM, font=('Consolas', 8),
+                                    relief='flat', bd=0, activebackground='#2a2a2a',
+                                    activeforeground=GREEN, command=self.cancel)
+        self.cancel_btn.pack(side=tk.LEFT)
         tk.Label(bar, textvariable=self.v_status, bg=PANEL, fg=DIM,
                  font=('Consolas', 8)).pack(side=tk.LEFT, padx=4)
         self.stats = tk.Label(bar, text="", bg=PANEL, fg=GREEN, font=('Consolas', 8))
         self.stats.pack(side=tk.RIGHT, padx=10)
+        self.prof_btn = tk.Button(bar, text="⏱ stages ▸", bg=PANEL, fg=DIM, font=('Consolas', 8),
+                                  relief='flat', bd=0, activebackground='#2a2a2a',
+                                  activeforeground=GREEN, command=self._toggle_profile)
+        self.prof_btn.pack(side=tk.RIGHT, padx=4)
+        self.cache_lbl = tk.Label(bar, text="", bg=PANEL, fg=DIM, font=('Consolas', 8))
+        self.cache_lbl.pack(side=tk.RIGHT, padx=4)
+
+        # stage timings, packed above the status bar while open
+        self.prof_panel = tk.Frame(self.root, bg=PANEL)
+        self.prof_txt = tk.Text(self.prof_panel, height=9, bg=INBG, fg=FG, font=('Consolas', 8),
+                                relief='flat', bd=0, state=tk.DISABLED, wrap=tk.NONE)
+        self.prof_txt.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(8, 4), pady=4)
+        for lbl, cmd in (("Clear", PROFILE.clear), ("JSON…", lambda: self._dump_profile('json')),
+                         ("Trace…", lambda: self._dump_profile('trace'))):
+            ttk.Button(self.prof_panel, text=lbl, command=cmd).pack(side=tk.TOP, fill=tk.X, padx=4, pady=2)
+
+    def _toggle_profile(self):
+        # opening the panel turns stage timing on, closing it turns it off again
+        PROFILE.enable(not PROFILE.enabled)
+        self.prof_btn.config(text="⏱ stages ▾" if PROFILE.enabled else "⏱ stages ▸")
+        if PROFILE.enabled:
+            self.prof_panel.pack(fill=tk.X, side=tk.BOTTOM)
+            self._refresh_profile()
+        else:
+            self.prof_panel.pack_forget()
+            if self.prof_job: self.root.after_cancel(self.prof_job); self.prof_job = None
+
+    def _refresh_profile(self):
+        rows = [f"{'stage':<28}{'calls':>7}{'wall ms':>11}{'cpu ms':>11}{'avg ms':>10}{'peak KB':>10}{'net KB':>10}"]
+        for name, (n, wall, cpu, peak, net) in PROFILE.summary().items():
+            rows.append(f"{name:<28}{n:>7}{wall * 1000:>11.1f}{cpu * 1000:>11.1f}"
+                        f"{wall * 1000 / n:>10.2f}{peak >> 10:>10}{net >> 10:>10}")
+        text = '\n'.join(rows)
+        t = self.prof_txt
+        if t.get('1.0', 'end-1c') != text:
+            t.config(state=tk.NORMAL)
+            t.delete('1.0', tk.END)
+            t.insert('1.0', text)
+            t.config(state=tk.DISABLED)
+        self.prof_job = self.root.after(500, self._refresh_profile)
+
+    def _dump_profile(self, fmt):
+        path = filedialog.asksaveasfilename(defaultextension='.json',
+                                            filetypes=[('JSON', '*.json'), ('All', '*.*')])
+        if not path: return
+        PROFILE.dump(path, fmt)
+        self.v_status.set("Trace saved ✓ (chrome://tracing or ui.perfetto.dev)" if fmt == 'trace'
+                          else "Stage timings saved ✓")
 
     def _divider(self, parent, title):
         f = tk.Frame(parent, bg=BG)
@@ -494,6 +407,7 @@ class App:
         self.root.bind('<space>',          lambda e: self.toggle_play())
         self.root.bind('<Control-equal>',  lambda e: self._zoom(1))
         self.root.bind('<Control-minus>',  lambda e: self._zoom(-1))
+        self.root.bind('<Escape>',         lambda e: self.cancel())
 
     def _apply_fontsize(self):
         self.out.configure(font=('Courier New', self.v_fontsize.get()))
@@ -501,24 +415,74 @@ class App:
     def _zoom(self, d):
         self.v_fontsize.set(max(4, min(28, self.v_fontsize.get() + d)))
         self._apply_fontsize()
+        self._queue_refill()
+        if self.canvas_on: self._toggle_bitmap()   # rebuilds the bitmaps, or falls back to text if they no longer fit
 
     def _live(self, *_):
-        if self.v_live.get() and self.img and not self.converting:
-            self.convert()
+        # debounce: every change restarts the timer and invalidates any preview still converting
+        if not (self.v_live.get() and self.img) or self.converting: return
+        self.preview_gen += 1
+        if self.preview_job: self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(PREVIEW_DEBOUNCE_MS, self._start_preview)
+
+    def _start_preview(self):
+        self.preview_job = None
+        if self.converting: return
+        self.stop_gif()
+        params = (self.v_mode.get(), self.v_width.get(), self._get_chars(),
+                  self.v_bright.get(), self.v_contrast.get(), self.v_sat.get(),
+                  self.v_invert.get(), self.v_dither.get(), self.v_edge.get(), self.v_palette.get())
+        threading.Thread(target=self._preview_thread, args=(self.preview_gen, self.img, self._img_key(), params),
+                         daemon=True).start()
+
+    def _preview_thread(self, gen, img, key, params):
+        # draft at low width first, then the real width; bails out as soon as a newer change arrives
+        def check(_):
+            if gen != self.preview_gen: raise Cancelled
+        width = params[1]
+        widths = [PREVIEW_DRAFT_WIDTH, width] if width > PREVIEW_DRAFT_WIDTH * 1.5 else [width]
+        try:
+            for w in widths:
+                frame = convert_frame(img, params[0], w, *params[2:], prog_cb=check,
+                                      cache=self.stages, key=key)
+                self.root.after(0, self._preview_ready, gen, frame, w == width)
+        except Cancelled:
+            pass
+        except Exception as e:
+            self.root.after(0, self.v_status.set, f"Preview failed: {e}")
+
+    def _preview_ready(self, gen, frame, final):
+        if gen != self.preview_gen or self.converting: return
+        self._use_canvas(False)
+        self._show(frame)
+        if final:
+            self.result = frame
+            self.v_status.set("Preview ✓")
+        else:
+            self.v_status.set("Preview (draft)...")
+
+    def _img_key(self):
+        # gif frames are cached as (img_key, index), so the first frame shares entries with its conversion
+        return (self.img_key, 0) if self.is_gif else self.img_key
 
     def _get_chars(self):
         c = self.v_custom.get().strip()
         return list(c) if c else CHARS.get(self.v_charset.get(), list(' .:-=+*#%@'))
 
     def _set_ui(self, enabled):
+        # the widget tree never changes after _ui, so collect the buttons once
+        if self._buttons is None:
+            self._buttons = []
+            def walk(w):
+                for child in w.winfo_children():
+                    if isinstance(child, (ttk.Button, tk.Button)) and child is not self.cancel_btn:
+                        self._buttons.append(child)
+                    walk(child)
+            walk(self.root)
         state = tk.NORMAL if enabled else tk.DISABLED
-        def walk(w):
-            for child in w.winfo_children():
-                if isinstance(child, (ttk.Button, tk.Button)):
-                    try: child.config(state=state)
-                    except: pass
-                walk(child)
-        walk(self.root)
+        for b in self._buttons:
+            try: b.config(state=state)
+            except: pass
 
     # loading
     def load(self):
@@ -526,44 +490,46 @@ class App:
             filetypes=[('Images', '*.jpg *.jpeg *.png *.bmp *.gif *.webp *.tiff'), ('All', '*.*')])
         if not path: return
         try:
-            raw = Image.open(path)
-            self.img_path = path
-            self.stop_gif()
-
-            # count frames
-            nf = 0
-            try:
-                while True: raw.seek(nf); nf += 1
-            except EOFError: pass
-            raw.seek(0)
-
-            if nf > 1 and path.lower().endswith('.gif'):
-                self.is_gif = True
-                self.v_status.set(f"Extracting {nf} frames...")
-                self.root.update()
-                self.gif_frames    = extract_gif_frames(raw)
-                self.gif_durations = [f[1] for f in self.gif_frames]
-                self.gif_converted = []
-                self.img           = self.gif_frames[0][0]
-                self.result        = None
-                n = len(self.gif_frames)
-                w, h = self.img.size
-                self.info_lbl.config(text=f"{os.path.basename(path)}\n{w}×{h}  {n} frames  GIF")
-                self.v_status.set(f"Loaded GIF — {n} frames. Hit Convert.")
-                self.scrubber.config(to=max(0, n-1))
-                self.frame_lbl.config(text=f"—/{n}")
-                self._build_gif_thumbs()
-                self._cycle_gif_preview()
-            else:
-                self.is_gif = False
-                self.gif_frames = []
-                self.gif_converted = []
-                self.img = raw.convert('RGB')
-                self.gif_bar.pack_forget()
-                w, h = self.img.size
-                self.info_lbl.config(text=f"{os.path.basename(path)}\n{w}×{h} | {raw.mode}")
-                self.v_status.set(f"Loaded: {os.path.basename(path)}")
-                self._update_preview()
+            with PROFILE.stage('load'):
+                raw = open_draftable(path)
+                self.img_path = path
+                st = os.stat(path)
+                self.img_key = (path, st.st_mtime_ns, st.st_size)
+                self.img_digest = None
+                self.stop_gif()
+                self._use_canvas(False)
+
+                nf = getattr(raw, 'n_frames', 1)
+
+                if nf > 1 and path.lower().endswith('.gif'):
+                    raw.close()
+                    self.is_gif = True
+                    self.gif_count     = nf
+                    self.gif_durations = []
+                    self.gif_converted = []
+                    self.img           = next(extract_gif_frames(path))[0]
+                    self.result        = None
+                    n = nf
+                    w, h = self.img.size
+                    self.info_lbl.config(text=f"{os.path.basename(path)}\n{w}×{h}  {n} frames  GIF")
+                    self.v_status.set(f"Loaded GIF — {n} frames. Hit Convert.")
+                    self.scrubber.config(to=max(0, n-1))
+                    self.frame_lbl.config(text=f"—/{n}")
+                    self._start_gif_preview()
+                else:
+                    self.is_gif = False
+                    self._stop_gif_preview()
+                    self.gif_count = 0
+                    self.gif_converted = []
+                    w, h = raw.size
+                    mode = raw.mode
+                    raw.close()
+                    self.img = open_image(path)   # huge scans come back reduced to a working size
+                    self.gif_bar.pack_forget()
+                    shown = "" if self.img.size == (w, h) else f" → {self.img.width}×{self.img.height}"
+                    self.info_lbl.config(text=f"{os.path.basename(path)}\n{w}×{h}{shown} | {mode}")
+                    self.v_status.set(f"Loaded: {os.path.basename(path)}")
+                    self._update_preview()
         except Exception as e:
             messagebox.showerror("Couldn't open", str(e))
 
@@ -574,21 +540,25 @@ class App:
         self._preview_photo = ImageTk.PhotoImage(thumb)
         self.preview.configure(image=self._preview_photo, text='')
 
-    def _build_gif_thumbs(self):
-        if self.gif_thumb_job: self.root.after_cancel(self.gif_thumb_job)
-        self.gif_thumb_photos = []
-        for pil, _ in self.gif_frames:
-            t = pil.copy(); t.thumbnail((235, 175), Image.Resampling.LANCZOS)
-            self.gif_thumb_photos.append(ImageTk.PhotoImage(t))
-        self.gif_thumb_idx = 0
+    def _stop_gif_preview(self):
+        if self.gif_thumb_job: self.root.after_cancel(self.gif_thumb_job); self.gif_thumb_job = None
+        self.gif_thumb_iter = None
+
+    def _start_gif_preview(self):
+        self._stop_gif_preview()
+        self._cycle_gif_preview()
 
     def _cycle_gif_preview(self):
-        if not self.gif_thumb_photos: return
-        photo = self.gif_thumb_photos[self.gif_thumb_idx]
-        self.preview.configure(image=photo, text='')
-        self._preview_photo = photo
-        self.gif_thumb_idx = (self.gif_thumb_idx + 1) % len(self.gif_thumb_photos)
-        dur = self.gif_durations[self.gif_thumb_idx] if self.gif_durations else 100
+        # decodes the next frame on demand rather than keeping a thumbnail per frame
+        if not self.is_gif: return
+        frame = next(self.gif_thumb_iter, None) if self.gif_thumb_iter else None
+        if frame is None:
+            self.gif_thumb_iter = extract_gif_frames(self.img_path)
+            frame = next(self.gif_thumb_iter)
+        thumb, dur = frame
+        thumb.thumbnail((235, 175), Image.Resampling.LANCZOS)
+        self._preview_photo = ImageTk.PhotoImage(thumb)
+        self.preview.configure(image=self._preview_photo, text='')
         self.gif_thumb_job = self.root.after(max(50, dur), self._cycle_gif_preview)
 
     # conversion
@@ -597,25 +567,61 @@ class App:
             messagebox.showwarning("Nothing loaded", "Load an image first!"); return
         if self.converting: return
         self.converting = True
+        self.preview_gen += 1
+        self.cancel_evt.clear()
         self.stop_gif()
+        self._use_canvas(False)
         self._set_ui(False)
         self.v_progress.set(0)
         if self.is_gif:
-            self.v_status.set(f"Converting {len(self.gif_frames)} frames...")
+            self.v_status.set(f"Converting {self.gif_count} frames...")
             threading.Thread(target=self._gif_thread, daemon=True).start()
         else:
             self.v_status.set("Converting...")
             threading.Thread(target=self._static_thread, daemon=True).start()
 
+    def _cache_key(self, args, palette):
+        # called from the conversion threads; None when the disk cache is unavailable
+        if not self.disk_cache: return None
+        if self.img_digest is None: self.img_digest = file_digest(self.img_path)
+        return DiskCache.key(self.img_digest, args, palette)
+
+    def _progress(self, total, status=None):
+        # callback for worker threads: one root.after per tick, rate-limited except for the final one
+        last = [0.0]
+        def cb(done):
+            now = time.perf_counter()
+            if done < total and now - last[0] < 1 / PROGRESS_HZ: return
+            last[0] = now
+            self.root.after(0, self._set_progress, int(done / total * 100),
+                            status and status.format(done=done, total=total))
+        return cb
+
+    def _set_progress(self, pct, status):
+        self.v_progress.set(pct)
+        if status: self.v_status.set(status)
+
+    def _cache_stats(self):
+        if self.disk_cache: self.cache_lbl.config(text=self.disk_cache.summary())
+
     def _static_thread(self):
         try:
-            rows = convert_frame(
-                self.img, self.v_mode.get(), self.v_width.get(), self._get_chars(),
-                self.v_bright.get(), self.v_contrast.get(), self.v_sat.get(),
-                self.v_invert.get(), self.v_dither.get(), self.v_edge.get(),
-                lambda v: self.root.after(0, self.v_progress.set, v))
-            self.result = (self.v_mode.get(), rows)
-            self.root.after(0, self._show, self.v_mode.get(), rows)
+            args = (self.v_mode.get(), self.v_width.get(), self._get_chars(),
+                    self.v_bright.get(), self.v_contrast.get(), self.v_sat.get(),
+                    self.v_invert.get(), self.v_dither.get(), self.v_edge.get())
+            palette = self.v_palette.get()
+            key = self._cache_key(args, palette)
+            hit = key and self.disk_cache.get(key)
+            if hit:
+                frame = hit[0][0]
+            else:
+                frame = convert_frame(self.img, *args, palette,
+                                      self._progress(100),
+                                      self.stages, self._img_key())
+                if key: self.disk_cache.put(key, [frame])
+            self.root.after(0, self._cache_stats)
+            self.result = frame
+            self.root.after(0, self._show, frame)
         except Exception as e:
             self.root.after(0, lambda: messagebox.showerror("Error", str(e)))
         finally:
@@ -626,18 +632,33 @@ class App:
     def _gif_thread(self):
         try:
             mode = self.v_mode.get()
-            total = len(self.gif_frames)
-            out = []
-            for i, (frame, _) in enumerate(self.gif_frames):
-                rows = convert_frame(
-                    frame, mode, self.v_width.get(), self._get_chars(),
+            total = self.gif_count
+            args = (mode, self.v_width.get(), self._get_chars(),
                     self.v_bright.get(), self.v_contrast.get(), self.v_sat.get(),
                     self.v_invert.get(), self.v_dither.get(), self.v_edge.get())
-                out.append(rows)
-                self.root.after(0, self.v_progress.set, int((i+1)/total*100))
-                self.root.after(0, self.v_status.set, f"Frame {i+1}/{total}...")
+            key = self._cache_key(args, self.v_palette.get())
+            hit = key and self.disk_cache.get(key)
+            if hit:
+                self.gif_converted, self.gif_durations = hit
+                self.root.after(0, self._cache_stats)
+                self.root.after(0, self._gif_ready, mode)
+                return
+            args += (shared_palette(self.img, args, self.v_palette.get()),)
+            prog = self._progress(total, "Frame {done}/{total}...")
+            durations = []
+            def frames():
+                for img, dur in extract_gif_frames(self.img_path):
+                    durations.append(dur)
+                    yield img
+            out = convert_frames(frames(), args, max(1, self.v_workers.get()), prog, self.cancel_evt,
+                                 self.stages, self.img_key)
+            if out is None:
+                self.root.after(0, self.v_status.set, "Cancelled")
+                return
             self.gif_converted = out
-            self.gif_mode = mode
+            self.gif_durations = durations
+            if key: self.disk_cache.put(key, out, durations)
+            self.root.after(0, self._cache_stats)
             self.root.after(0, self._gif_ready, mode)
         except Exception as e:
             self.root.after(0, lambda: messagebox.showerror("Error", str(e)))
@@ -645,36 +666,126 @@ class App:
             self.converting = False
             self.root.after(0, self._set_ui, True)
 
+    def cancel(self):
+        if self.converting:
+            self.cancel_evt.set()
+            self.v_status.set("Cancelling...")
+
     def _gif_ready(self, mode):
         n = len(self.gif_converted)
         self.scrubber.config(to=max(0, n-1))
         self.gif_bar.pack(fill=tk.X, before=self.out)
+        if self.v_bitmap.get(): self._toggle_bitmap()
         self.anim_idx = 0
         self.playing = True
         self.play_btn.config(text="⏸ Pause")
         self.v_status.set(f"Done ✓  {n} frames — Space to pause")
-        self._tick()
+        self._start_play()
 
     # playback
+    def _frame_secs(self, i):
+        d = self.gif_durations[i] if self.gif_durations else 100
+        return max(16, d / (self.v_speed.get() / 100.0)) / 1000
+
+    def _start_play(self):
+        self.play_due = time.perf_counter()
+        self.play_times.clear()
+        self.play_skipped = 0
+        self._tick()
+
     def _tick(self):
+        # drift-corrected: each frame's slot starts where the previous one's ended, not when
+        # its after() fired, and frames whose slot has already passed are skipped
         if not self.playing or not self.gif_converted: return
-        rows = self.gif_converted[self.anim_idx]
-        self._show(self.gif_mode, rows)
+        n = len(self.gif_converted)
+        now = time.perf_counter()
+        if now - self.play_due > 1.0: self.play_due = now   # stalled (dragged window, breakpoint...)
+        while self.play_due + self._frame_secs(self.anim_idx) <= now:
+            self.play_due += self._frame_secs(self.anim_idx)
+            self.play_skipped += 1
+            if self.anim_idx + 1 >= n and not self.v_loop.get(): break
+            self.anim_idx = (self.anim_idx + 1) % n
+        self._display(self.anim_idx)
         self.v_frame.set(self.anim_idx)
-        self.frame_lbl.config(text=f"{self.anim_idx+1}/{len(self.gif_converted)}")
-
-        nxt = self.anim_idx + 1
-        if nxt >= len(self.gif_converted):
+        self.frame_lbl.config(text=f"{self.anim_idx+1}/{n}")
+        self.play_times.append(time.perf_counter())
+        if len(self.play_times) > 1:
+            got = (len(self.play_times) - 1) / max(self.play_times[-1] - self.play_times[0], 1e-6)
+            self.fps_lbl.config(text=f"{got:.1f}/{1 / self._frame_secs(self.anim_idx):.1f} fps"
+                                     f"  skipped {self.play_skipped}")
+
+        self.play_due += self._frame_secs(self.anim_idx)
+        if self.anim_idx + 1 >= n:
             if not self.v_loop.get():
                 self.playing = False
                 self.play_btn.config(text="▶ Play")
                 return
-            nxt = 0
-
-        delay = max(16, int((self.gif_durations[self.anim_idx] if self.gif_durations else 100)
-                            / (self.v_speed.get() / 100.0)))
-        self.anim_idx = nxt
-        self.anim_job = self.root.after(delay, self._tick)
+        self.anim_idx = (self.anim_idx + 1) % n
+        delay = int((self.play_due - time.perf_counter()) * 1000)
+        self.anim_job = self.root.after(max(1, delay), self._tick)
+
+    def _display(self, idx):
+        frame = self.gif_converted[idx]
+        if not self.canvas_on:
+            self._show(frame)
+            return
+        photo = self.bitmaps.get(id(frame))
+        if photo is None: return   # still being rendered; the last bitmap stays up
+        self.canvas.itemconfig(self.canvas_img, image=photo)
+        self.canvas.config(scrollregion=(0, 0, photo.width() + 8, photo.height() + 8))
+
+    def _use_canvas(self, on):
+        if on == self.canvas_on: return
+        self.canvas_on = on
+        if on:
+            self.out.pack_forget()
+            self.canvas.pack(fill=tk.BOTH, expand=True, pady=(2,0), after=self.gif_bar)
+            view = self.canvas
+        else:
+            self.canvas.pack_forget()
+            self.canvas.itemconfig(self.canvas_img, image='')
+            self.out.pack(fill=tk.BOTH, expand=True, pady=(2,0))
+            self.bitmap_gen += 1
+            self.bitmaps = {}
+            view = self.out
+        self.ys.config(command=view.yview)
+        self.xs.config(command=view.xview)
+        view.configure(yscrollcommand=self._on_yscroll if view is self.out else self.ys.set,
+                       xscrollcommand=self.xs.set)
+
+    def _toggle_bitmap(self):
+        on = self.v_bitmap.get() and bool(self.gif_converted)
+        if on and not self._start_bitmaps(): on = False
+        self._use_canvas(on)
+        if self.gif_converted and not self.playing:
+            self._display(max(0, min(self.v_frame.get(), len(self.gif_converted)-1)))
+
+    def _start_bitmaps(self):
+        # renders each distinct frame once with the png exporter, off the Tk thread; the
+        # PhotoImages are made on the Tk thread as the renders arrive
+        self.bitmap_gen += 1
+        self.bitmaps = {}
+        gen = self.bitmap_gen
+        uniq = list({id(f): f for f in self.gif_converted}.values())
+        fnt = self._get_font(); cw, ch = self._measure(fnt)
+        need = sum(f.width * cw * len(f) * ch * 4 for f in uniq)
+        if need > BITMAP_BUDGET:
+            self.v_bitmap.set(False)
+            self.v_status.set(f"Bitmap playback would need ~{need >> 20} MB — lower the width or zoom")
+            return False
+        def work():
+            for f in uniq:
+                if gen != self.bitmap_gen: return
+                self.root.after(0, self._bitmap_ready, gen, f, rows_to_image(f, fnt, cw, ch), len(uniq))
+        threading.Thread(target=work, daemon=True).start()
+        return True
+
+    def _bitmap_ready(self, gen, frame, img, total):
+        if gen != self.bitmap_gen: return
+        self.bitmaps[id(frame)] = ImageTk.PhotoImage(img)
+        done = len(self.bitmaps)
+        self.v_status.set(f"Bitmaps {done}/{total}" if done < total else "Bitmap playback ready ✓")
+        if not self.playing: self._display(max(0, min(self.v_frame.get(), len(self.gif_converted)-1)))
 
     def toggle_play(self):
         if not self.gif_converted: return
@@ -685,7 +796,7 @@ class App:
         else:
             self.playing = True
             self.play_btn.config(text="⏸ Pause")
-            self._tick()
+            self._start_play()
 
     def stop_gif(self):
         self.playing = False
@@ -698,59 +809,119 @@ class App:
         if not self.gif_converted: return
         idx = max(0, min(int(float(val)), len(self.gif_converted)-1))
         self.anim_idx = idx
-        self._show(self.gif_mode, self.gif_converted[idx])
+        self._display(idx)
         self.frame_lbl.config(text=f"{idx+1}/{len(self.gif_converted)}")
 
     # rendering text widget
-    def _show(self, mode, rows):
+    @profiled('_show')
+    def _show(self, frame):
+        # the whole frame stays in memory but only the rows around the visible part are drawn;
+        # the rest of the widget is blank lines, so scrolling and the scrollbar see the full height
+        t0 = time.perf_counter()
         w = self.out
         w.config(state=tk.NORMAL)
-        w.delete('1.0', tk.END)
+        if self.shown is None or len(self.shown) != len(frame):
+            w.delete('1.0', tk.END)
+            w.insert('1.0', '\n' * max(0, len(frame) - 1))
+            self.view_rows = (0, 0)
 
-        # only clear tags when not mid-animation (slow otherwise)
-        if not self.playing:
+        # tags are reused across frames; only purge once too many colors have piled up
+        if len(self.tags) > TAG_LIMIT:
             for tag in list(self.tags):
                 try: w.tag_delete(tag)
                 except: pass
             self.tags.clear()
 
-        nrows = len(rows)
-        chars = 0
-
-        if mode == 'grayscale':
-            w.insert(tk.END, '\n'.join(rows))
-            chars = sum(len(r) for r in rows)
-        elif mode == 'color':
-            for i, row in enumerate(rows):
-                for ch, col in row:
-                    t = 'c' + col[1:]
-                    if t not in self.tags:
-                        w.tag_configure(t, foreground=col); self.tags.add(t)
-                    w.insert(tk.END, ch, t); chars += 1
-                if i < nrows-1: w.insert(tk.END, '\n')
-        elif mode == 'halfblock':
-            for i, row in enumerate(rows):
-                for ch, fg, bg in row:
-                    t = 'h' + fg[1:] + bg[1:]
-                    if t not in self.tags:
-                        w.tag_configure(t, foreground=fg, background=bg); self.tags.add(t)
-                    w.insert(tk.END, ch, t); chars += 1
-                if i < nrows-1: w.insert(tk.END, '\n')
-
+        self.shown = frame
+        top, bottom = self._visible_rows()
+        self._draw_rows(max(0, top - VIEW_MARGIN), min(len(frame), bottom + VIEW_MARGIN))
         w.config(state=tk.DISABLED)
-        if not self.playing:
-            self.stats.config(text=f"{nrows} rows × {self.v_width.get()} cols  {chars:,} chars")
+
+        nrows = len(frame)
+        chars = nrows * frame.width
+        ms = (time.perf_counter() - t0) * 1000
+        fps = 1000 / max(ms, 1e-3)
+        a, b = self.view_rows
+        self.stats.config(text=f"{nrows} rows × {frame.width} cols  {chars:,} chars  drew {b - a} rows  "
+                               f"render {ms:.1f} ms ({fps:.0f} fps{' ✓' if fps >= RENDER_FPS_TARGET else ''})")
+
+    def _visible_rows(self):
+        w = self.out
+        top = int(w.index('@0,0').split('.')[0]) - 1
+        bottom = int(w.index(f'@0,{w.winfo_height()}').split('.')[0])
+        return top, bottom
+
+    @profiled('_draw_rows')
+    def _draw_rows(self, a, b):
+        # blanks the previously drawn rows, then draws rows a:b with one multi-segment insert
+        w = self.out
+        pa, pb = self.view_rows
+        if pb > pa:
+            w.delete(f'{pa+1}.0', f'{pb}.end')
+            w.insert(f'{pa+1}.0', '\n' * (pb - pa - 1))
+        self.view_rows = (a, b)
+        if b <= a: return
+        w.delete(f'{a+1}.0', f'{b}.end')   # the rows are blank, so this only drops their newlines
+        frame = self.shown.rows(a, b)
+        if frame.mode == 'grayscale':
+            w.insert(f'{a+1}.0', frame.text())
+            return
+        cols, runs = frame_runs(frame)
+        tags = []
+        for col in cols:
+            if frame.mode == 'color':
+                t = 'c' + col[1:]
+                if t not in self.tags:
+                    w.tag_configure(t, foreground=col); self.tags.add(t)
+            else:
+                fg, bg = col
+                t = 'h' + fg[1:] + bg[1:]
+                if t not in self.tags:
+                    w.tag_configure(t, foreground=fg, background=bg); self.tags.add(t)
+            tags.append(t)
+        # text, tag, text, tag, ... with untagged newlines
+        args = []
+        for i, row in enumerate(runs):
+            for text, k in row: args += (text, tags[k])
+            if i < b - a - 1: args += ('\n', ())
+        if args: w.insert(f'{a+1}.0', *args)
+
+    def _on_yscroll(self, first, last):
+        self.ys.set(first, last)
+        self._queue_refill()
+
+    def _queue_refill(self):
+        if self.shown is not None and not self.view_job:
+            self.view_job = self.root.after_idle(self._refill)
+
+    def _refill(self):
+        # redraws once the visible rows leave the drawn range (scrolling, resizing, zoom)
+        self.view_job = None
+        if self.shown is None: return
+        top, bottom = self._visible_rows()
+        a, b = self.view_rows
+        if a <= top and min(bottom, len(self.shown)) <= b: return
+        self.out.config(state=tk.NORMAL)
+        self._draw_rows(max(0, top - VIEW_MARGIN), min(len(self.shown), bottom + VIEW_MARGIN))
+        self.out.config(state=tk.DISABLED)
 
     # exports
+    def _current(self):
+        if self.is_gif and self.gif_converted:
+            return self.gif_converted[max(0, min(self.v_frame.get(), len(self.gif_converted)-1))]
+        return self.result
+
     def copy(self):
-        txt = self.out.get('1.0', tk.END).strip()
-        if not txt: messagebox.showwarning("Empty", "Nothing to copy."); return
+        frame = self._current()
+        if not frame: messagebox.showwarning("Empty", "Nothing to copy."); return
+        txt = frame.text()
         self.root.clipboard_clear(); self.root.clipboard_append(txt)
         self.v_status.set("Copied ✓")
 
     def save_txt(self):
-        txt = self.out.get('1.0', tk.END).strip()
-        if not txt: messagebox.showwarning("Empty", "Nothing to save."); return
+        frame = self._current()
+        if not frame: messagebox.showwarning("Empty", "Nothing to save."); return
+        txt = frame.text()
         path = filedialog.asksaveasfilename(defaultextension='.txt',
                                             filetypes=[('Text', '*.txt'), ('All', '*.*')])
         if path:
@@ -762,25 +933,38 @@ class App:
             path = filedialog.asksaveasfilename(defaultextension='.html',
                                                 filetypes=[('HTML', '*.html'), ('All', '*.*')])
             if not path: return
-            html = make_animated_html(self.gif_converted, self.gif_durations, self.gif_mode,
-                                      fontsize=self.v_fontsize.get())
+            html = make_compact_html(self.gif_converted, self.gif_durations,
+                                     fontsize=self.v_fontsize.get())
             open(path, 'w', encoding='utf-8').write(html)
             self.v_status.set("Animated HTML exported ✓")
             if messagebox.askyesno("Open?", "Open in browser?"):
                 import webbrowser; webbrowser.open('file://' + os.path.abspath(path))
         elif self.result:
-            mode, rows = self.result
             path = filedialog.asksaveasfilename(defaultextension='.html',
                                                 filetypes=[('HTML', '*.html'), ('All', '*.*')])
             if not path: return
             open(path, 'w', encoding='utf-8').write(
-                make_static_html(rows, mode, fontsize=self.v_fontsize.get()))
+                make_static_html(self.result, fontsize=self.v_fontsize.get()))
             self.v_status.set("HTML exported ✓")
             if messagebox.askyesno("Open?", "Open in browser?"):
                 import webbrowser; webbrowser.open('file://' + os.path.abspath(path))
         else:
             messagebox.showwarning("Nothing", "Convert something first.")
 
+    def export_ansi(self):
+        # truecolor escapes for `cat` in a terminal; gifs as a full first frame then per-frame deltas
+        if self.is_gif and self.gif_converted:
+            data = ''.join(ansi_stream(self.gif_converted)) + ANSI_RESET
+        elif self.result:
+            data = frame_to_ansi(self.result) + '\n'
+        else:
+            messagebox.showwarning("Nothing", "Convert something first."); return
+        path = filedialog.asksaveasfilename(defaultextension='.ans',
+                                            filetypes=[('ANSI', '*.ans'), ('All', '*.*')])
+        if not path: return
+        open(path, 'w', encoding='utf-8').write(data)
+        self.v_status.set("ANSI exported ✓")
+
     def export_png(self):
         if self.is_gif and self.gif_converted:
             all_frames = messagebox.askyesno("GIF export",
@@ -792,18 +976,17 @@ class App:
                 fnt = self._get_font(); cw, ch = self._measure(fnt)
                 base = os.path.splitext(os.path.basename(self.img_path))[0]
                 def go():
-                    for i, rows in enumerate(self.gif_converted):
-                        rows_to_image(rows, self.gif_mode, fnt, cw, ch)\
-                            .save(os.path.join(folder, f"{base}_{i:04d}.png"))
-                        self.root.after(0, self.v_progress.set, int((i+1)/len(self.gif_converted)*100))
+                    prog = self._progress(len(self.gif_converted))
+                    for i, frame in enumerate(self.gif_converted):
+                        rows_to_image(frame, fnt, cw, ch).save(os.path.join(folder, f"{base}_{i:04d}.png"))
+                        prog(i + 1)
                     self.root.after(0, self.v_status.set, f"Exported {len(self.gif_converted)} PNGs ✓")
                 threading.Thread(target=go, daemon=True).start()
                 return
             else:
-                rows = self.gif_converted[self.anim_idx]
-                mode = self.gif_mode
+                frame = self._current()
         elif self.result:
-            mode, rows = self.result
+            frame = self.result
         else:
             messagebox.showwarning("Nothing", "Convert something first."); return
 
@@ -812,31 +995,27 @@ class App:
         if not path: return
         try:
             fnt = self._get_font(); cw, ch = self._measure(fnt)
-            rows_to_image(rows, mode, fnt, cw, ch).save(path)
+            rows_to_image(frame, fnt, cw, ch).save(path)
             self.v_status.set("PNG exported ✓")
         except Exception as e:
             messagebox.showerror("Export failed", str(e))
 
     def _get_font(self):
-        sz = max(8, self.v_fontsize.get())
-        for name in ("cour.ttf", "DejaVuSansMono.ttf", "LiberationMono-Regular.ttf"):
-            try: return ImageFont.truetype(name, sz)
-            except: pass
-        return ImageFont.load_default()
+        return load_font(self.v_fontsize.get())
 
     def _measure(self, fnt):
-        d = ImageDraw.Draw(Image.new('RGB', (80, 80)))
-        bb = d.textbbox((0,0), 'X', font=fnt)
-        return bb[2]-bb[0]+1, bb[3]-bb[1]+2
+        return measure_font(fnt)
 
     def reset(self):
         self.stop_gif()
         self.v_width.set(120);    self.v_bright.set(1.0)
         self.v_contrast.set(1.1); self.v_sat.set(1.2)
-        self.v_invert.set(False); self.v_dither.set(False)
+        self.v_invert.set(False); self.v_dither.set("off")
         self.v_live.set(False);   self.v_charset.set("Standard")
         self.v_edge.set("off");   self.v_fontsize.set(9)
+        self.v_palette.set("off")
         self.v_custom.set("");    self.v_speed.set(100)
+        self.v_workers.set(os.cpu_count() or 1)
         self._apply_fontsize()
         self.v_status.set("Reset ✓")
 
@@ -0,0 +1,1646 @@
+from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageChops, JpegImagePlugin
+import numpy as np
+import argparse
+import glob
+import os
+import sys
+import json
+import base64
+import threading
+import hashlib
+import functools
+import math
+import multiprocessing
+import time
+import tracemalloc
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, Future
+
+
+CHARS = {
+    "Standard": list(' .\'`^",:;Il!i><~+_-?][}{1)(|\\/tfjrxnuvczXYUJCLQ0OZmwqpdbkhao*#MW&8%B@$'),
+    "Dense":    list('@#S%?*+;:,. '),
+    "Sparse":   list(' .-:=+*#%@'),
+    "Blocks":   list(' ░▒▓█'),
+    "Braille":  list(' ⠁⠂⠃⠄⠅⠆⠇⠈⠉⠊⠋⠌⠍⠎⠏⠐⠑⠒⠓⠔⠕⠖⠗⠘⠙⠚⠛⠜⠝⠞⠟⠠⠡⠢⠣⠤⠥⠦⠧⠨⠩⠪⠫⠬⠭⠮⠯⠰⠱⠲⠳⠴⠵⠶⠷⠸⠹⠺⠻⠼⠽⠾⠿'),
+    "Minimal":  list(' :. #'),
+}
+
+HALF_BLOCK = "▀"
+MODES = ['color', 'halfblock', 'grayscale', 'braille', 'braille mono', 'structure', 'structure mono']
+
+# braille: every U+2800 pattern, indexed by its dot bits; _BRAILLE_BITS gives the bit of each
+# dot in a 4-row × 2-column cell (dots 1-3 and 4-6 run down the columns, 7 and 8 are the bottom row)
+BRAILLE = ''.join(chr(0x2800 + i) for i in range(256))
+_BRAILLE_BITS = np.array([[0, 3], [1, 4], [2, 5], [6, 7]], np.uint8)
+
+# still images bigger than this are brought down to about this many pixels while decoding; the
+# widest mode (structure, 4 samples per char at width 300) needs a fraction of it
+WORK_PIXELS = 1 << 24
+# Pillow's decompression-bomb guard keeps its default. only JPEGs may go past it, up to this,
+# because open_image has them decoded at a reduced DCT scale (down to 1/8 per side)
+DRAFT_MAX_PIXELS = 1 << 30
+
+
+# profiling — PROFILE.stage(name) times a block: wall and thread cpu time, plus the peak and net
+# bytes allocated while it ran, from tracemalloc (started by PROFILE.enable). that sees python
+# objects and numpy arrays but not Pillow's image buffers, and it's process-wide, so stages running
+# at the same time in other threads add to each other's peaks. while PROFILE.enabled is False
+# stage() hands back one shared do-nothing context, so instrumented code pays a flag check.
+# stages run in pool worker processes aren't seen
+class _NoStage:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+
+_NO_STAGE = _NoStage()
+
+
+class _Stage:
+    __slots__ = ('prof', 'name', 'wall', 'cpu', 'mem', 'outer')
+
+    def __init__(self, prof, name):
+        self.prof = prof
+        self.name = name
+
+    def __enter__(self):
+        # tracemalloc keeps one peak, so each stage resets it and hands the highest total seen
+        # back to the stage around it through prof.peak on exit
+        self.mem, peak = tracemalloc.get_traced_memory()   # (0, 0) when not tracing
+        self.outer = max(self.prof.peak, peak)
+        self.prof.peak = 0
+        tracemalloc.reset_peak()
+        self.cpu = time.thread_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        cur, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, self.prof.peak)
+        self.prof.peak = max(self.outer, peak)
+        self.prof.record(self.name, self.wall, wall, cpu, max(0, peak - self.mem), cur - self.mem)
+        return False
+
+
+class Profiler:
+    def __init__(self, max_events=100_000):
+        self.enabled = False
+        self.events = deque(maxlen=max_events)   # (name, start, wall, cpu, peak bytes, net bytes, thread id)
+        self.t0 = time.perf_counter()
+        self.lock = threading.Lock()
+        self.peak = 0
+        self._tracing = False   # whether enable() started tracemalloc, so it's ours to stop
+
+    def enable(self, on=True):
+        # memory figures need tracemalloc, which slows allocation down, so it only runs while enabled
+        self.enabled = on
+        if on and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        elif not on and self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def stage(self, name):
+        return _Stage(self, name) if self.enabled else _NO_STAGE
+
+    def record(self, name, start, wall, cpu, peak, net):
+        with self.lock:
+            self.events.append((name, start, wall, cpu, peak, net, threading.get_ident()))
+
+    def clear(self):
+        with self.lock:
+            self.events.clear()
+            self.t0 = time.perf_counter()
+
+    def summary(self):
+        # name -> [calls, wall s, cpu s, largest peak bytes, net bytes], slowest total first
+        tot = {}
+        with self.lock:
+            for name, _, wall, cpu, peak, net, _ in self.events:
+                t = tot.setdefault(name, [0, 0.0, 0.0, 0, 0])
+                t[0] += 1; t[1] += wall; t[2] += cpu; t[3] = max(t[3], peak); t[4] += net
+        return dict(sorted(tot.items(), key=lambda kv: -kv[1][1]))
+
+    def to_json(self):
+        stages = {k: dict(calls=c, wall_ms=round(w * 1000, 3), cpu_ms=round(u * 1000, 3), peak_kb=p >> 10,
+                          net_kb=m >> 10)
+                  for k, (c, w, u, p, m) in self.summary().items()}
+        return json.dumps({'stages': stages, 'events': len(self.events)}, indent=1)
+
+    def chrome_trace(self):
+        # chrome://tracing / perfetto "complete" events; nested stages stack up per thread
+        pid = os.getpid()
+        with self.lock:
+            ev = [dict(name=name, ph='X', pid=pid, tid=tid, ts=round((start - self.t0) * 1e6, 1),
+                       dur=round(wall * 1e6, 1), args=dict(cpu_ms=round(cpu * 1000, 3), peak_kb=peak >> 10,
+                                                           net_kb=net >> 10))
+                  for name, start, wall, cpu, peak, net, tid in self.events]
+        return json.dumps({'traceEvents': ev, 'displayTimeUnit': 'ms'})
+
+    def dump(self, path, fmt='trace'):
+        with open(path, 'w') as fh:
+            fh.write(self.chrome_trace() if fmt == 'trace' else self.to_json())
+
+
+PROFILE = Profiler()
+
+
+def profiled(name):
+    # decorator form of PROFILE.stage for whole functions
+    def wrap(fn):
+        @functools.wraps(fn)
+        def run(*a, **kw):
+            if not PROFILE.enabled: return fn(*a, **kw)
+            with PROFILE.stage(name): return fn(*a, **kw)
+        return run
+    return wrap
+
+
+def open_draftable(path):
+    # Image.open, except that a JPEG over Pillow's bomb limit is let through up to DRAFT_MAX_PIXELS
+    try:
+        return Image.open(path)
+    except Image.DecompressionBombError as bomb:
+        if hasattr(path, 'seek'): path.seek(0)
+        try:
+            im = JpegImagePlugin.JpegImageFile(path)
+        except SyntaxError:
+            raise bomb from None
+        if im.size[0] * im.size[1] > DRAFT_MAX_PIXELS:
+            im.close()
+            raise Image.DecompressionBombError(f"JPEG is over the {DRAFT_MAX_PIXELS} pixel limit")
+        return im
+
+
+@profiled('open_image')
+def open_image(path, max_pixels=WORK_PIXELS):
+    # RGB image of at most ~max_pixels. JPEGs decode straight at a reduced DCT scale (draft).
+    # other formats decode at full size (Pillow can't decode part of a png or most tiffs); the
+    # result is box-reduced in horizontal bands, each converted to RGB on its own, so there's no
+    # second full-size copy on top of the decoded source
+    with open_draftable(path) as im:
+        W, H = im.size
+        if W * H > max_pixels:
+            # draft picks the smallest DCT scale at least this big, so asking for half the target
+            # side lands between 1/4 and all of max_pixels
+            scale = math.sqrt(max_pixels / (W * H)) / 2
+            im.draft('RGB', (max(1, int(W * scale)), max(1, int(H * scale))))
+            W, H = im.size
+        factor = math.ceil(math.sqrt(W * H / max_pixels)) if W * H > max_pixels else 1
+        if factor == 1: return im.convert('RGB')
+        out = Image.new('RGB', (-(-W // factor), -(-H // factor)))
+        band = factor * 64
+        for y in range(0, H, band):
+            out.paste(im.crop((0, y, W, min(H, y + band))).convert('RGB').reduce(factor), (0, y // factor))
+        return out
+
+
+def extract_gif_frames(path):
+    # generator: decodes and composites one frame at a time, so memory stays at a couple of frames
+    with Image.open(path) as gif:
+        bg = Image.new('RGBA', gif.size, (0, 0, 0, 255))
+        for i in range(getattr(gif, 'n_frames', 1)):
+            with PROFILE.stage('extract_gif_frames'):
+                gif.seek(i)
+                frame = gif.copy().convert('RGBA')
+                dur = gif.info.get('duration', 100) or 100
+                comp = bg.copy()
+                comp.paste(frame, (0, 0), frame)
+                out = comp.convert('RGB')
+            yield out, dur
+            disposal = getattr(gif, 'disposal_method', 0)
+            bg = Image.new('RGBA', gif.size, (0, 0, 0, 255)) if disposal == 2 else comp
+
+
+def px_to_char(val, chars):
+    idx = int(val / 255 * (len(chars) - 1))
+    return chars[max(0, min(idx, len(chars) - 1))]
+
+
+class _Memo:
+    # small thread-safe LRU for per-process caches keyed by user input (charsets, sizes), so a
+    # long-lived process like a server worker keeps the recent ones instead of every one it saw
+    def __init__(self, keep):
+        self.keep = keep
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, make):
+        with self._lock:
+            v = self._d.get(key)
+            if v is not None:
+                self._d.move_to_end(key)
+                return v
+        v = make()
+        with self._lock:
+            self._d[key] = v
+            while len(self._d) > self.keep: self._d.popitem(last=False)
+        return v
+
+    def __len__(self):
+        return len(self._d)
+
+
+_LUT_CACHE = {}
+_CP_CACHE = _Memo(64)
+
+def glyph_index(n):
+    # pixel value -> glyph index for an n-glyph set, same rounding as px_to_char
+    return np.clip((np.arange(256) / 255 * (n - 1)).astype(np.intp), 0, n - 1)
+
+
+def glyph_indices(px, chars):
+    # whole frame in one lookup, as compact uint8/uint16 indices into chars
+    n = len(chars)
+    lut = _LUT_CACHE.get(n)
+    if lut is None:
+        lut = _LUT_CACHE[n] = glyph_index(n).astype(np.uint8 if n <= 256 else np.uint16)
+    return lut[px]
+
+
+def codepoints(chars):
+    key = ''.join(chars)
+    return _CP_CACHE.get(key, lambda: np.array([ord(c) for c in key], dtype='<u4'))
+
+
+def pack_rgb(px):
+    px = px.astype(np.uint32)
+    return px[..., 0] << 16 | px[..., 1] << 8 | px[..., 2]
+
+
+class ConvertedFrame:
+    # result of convert_frame: glyph indices into chars plus uint8 RGB planes
+    # (fg for color, fg/bg for halfblock); strings and hex colors are only built on demand
+    __slots__ = ('mode', 'chars', 'idx', 'fg', 'bg')
+
+    def __init__(self, mode, chars, idx, fg=None, bg=None):
+        self.mode  = mode
+        self.chars = ''.join(chars)
+        self.idx   = idx
+        self.fg    = fg
+        self.bg    = bg
+
+    def __len__(self):
+        return self.idx.shape[0]
+
+    @property
+    def width(self):
+        return self.idx.shape[1]
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.idx, self.fg, self.bg) if a is not None)
+
+    def rows(self, a, b):
+        # rows a:b as a frame of views, for drawing only part of a big one
+        return ConvertedFrame(self.mode, self.chars, self.idx[a:b],
+                              None if self.fg is None else self.fg[a:b],
+                              None if self.bg is None else self.bg[a:b])
+
+    def lines(self):
+        # one utf-32 decode for the whole frame, sliced into rows
+        h, w = self.idx.shape
+        text = codepoints(self.chars)[self.idx].tobytes().decode('utf-32-le')
+        return [text[i*w:(i+1)*w] for i in range(h)]
+
+    def text(self):
+        return '\n'.join(self.lines())
+
+    def color_keys(self):
+        # one integer per cell: packed fg, or fg << 24 | bg in halfblock
+        key = pack_rgb(self.fg)
+        if self.bg is not None:
+            key = key.astype(np.uint64) << 24 | pack_rgb(self.bg)
+        return key
+
+    def palette(self):
+        # distinct colors (fg+bg pairs in halfblock) formatted once, plus each cell's index into them
+        key = self.color_keys()
+        uniq, inv = np.unique(key, return_inverse=True)
+        if self.bg is None:
+            cols = [f'#{v:06x}' for v in uniq.tolist()]
+        else:
+            cols = [(f'#{v >> 24:06x}', f'#{v & 0xffffff:06x}') for v in uniq.tolist()]
+        return cols, inv.reshape(key.shape)
+
+
+# dithering — (dy, dx, weight) per neighbour that receives quantization error
+DIFFUSION = {
+    'floyd':    ((0, 1, 7/16), (1, -1, 3/16), (1, 0, 5/16), (1, 1, 1/16)),
+    'atkinson': ((0, 1, 1/8), (0, 2, 1/8), (1, -1, 1/8), (1, 0, 1/8), (1, 1, 1/8), (2, 0, 1/8)),
+    'jarvis':   ((0, 1, 7/48), (0, 2, 5/48),
+                 (1, -2, 3/48), (1, -1, 5/48), (1, 0, 7/48), (1, 1, 5/48), (1, 2, 3/48),
+                 (2, -2, 1/48), (2, -1, 3/48), (2, 0, 5/48), (2, 1, 3/48), (2, 2, 1/48)),
+}
+DITHERS = ['off', 'floyd', 'atkinson', 'jarvis', 'bayer']
+
+_BAYER = np.array([[ 0, 32,  8, 40,  2, 34, 10, 42],
+                   [48, 16, 56, 24, 50, 18, 58, 26],
+                   [12, 44,  4, 36, 14, 46,  6, 38],
+                   [60, 28, 52, 20, 62, 30, 54, 22],
+                   [ 3, 35, 11, 43,  1, 33,  9, 41],
+                   [51, 19, 59, 27, 49, 17, 57, 25],
+                   [15, 47,  7, 39, 13, 45,  5, 37],
+                   [63, 31, 55, 23, 61, 29, 53, 21]]) / 64 - 0.5 + 1/128
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _levels(chars):
+    # evenly spaced tone levels, one per glyph, and a pixel value that maps onto each glyph
+    n = 2 if chars is None else min(len(chars), 256)
+    if chars is None or len(chars) > 256:
+        reps = np.array([0, 255] if n == 2 else range(256), dtype=np.uint8)
+    else:
+        reps = np.searchsorted(glyph_index(n), np.arange(n)).astype(np.uint8)
+    return n, reps
+
+
+def _diffuse_rows(arr, top, kernel):
+    # pure NumPy: only the in-row carry is scalar, errors into later rows go a whole row at a time
+    h, w = arr.shape
+    step = 255 / top
+    ahead = [(dx, wt) for dy, dx, wt in kernel if dy == 0]
+    below = [(dy, dx, wt) for dy, dx, wt in kernel if dy > 0]
+    q = np.empty((h, w), dtype=np.intp)
+    for y in range(h):
+        row = arr[y].tolist()
+        qrow = [0] * w
+        err = [0.0] * w
+        for x in range(w):
+            old = row[x]
+            k = int(old / step + 0.5)
+            k = 0 if k < 0 else top if k > top else k
+            e = old - k * step
+            qrow[x] = k; err[x] = e
+            for dx, wt in ahead:
+                if x + dx < w: row[x + dx] += e * wt
+        q[y] = qrow
+        err = np.array(err)
+        for dy, dx, wt in below:
+            if y + dy >= h: continue
+            if dx >= 0: arr[y+dy, dx:] += err[:w-dx] * wt
+            else:       arr[y+dy, :dx] += err[-dx:] * wt
+    return q
+
+
+def _diffuse_loop(arr, top, dys, dxs, wts):
+    h, w = arr.shape
+    step = 255 / top
+    q = np.empty((h, w), dtype=np.intp)
+    for y in range(h):
+        for x in range(w):
+            old = arr[y, x]
+            k = min(max(int(old / step + 0.5), 0), top)
+            e = old - k * step
+            q[y, x] = k
+            for i in range(len(dys)):
+                yy, xx = y + dys[i], x + dxs[i]
+                if yy < h and 0 <= xx < w: arr[yy, xx] += e * wts[i]
+    return q
+
+
+_diffuse_fast = njit(cache=True)(_diffuse_loop) if njit else None
+
+
+def error_diffuse(px, kernel, chars=None):
+    n, reps = _levels(chars)
+    if n < 2: return px
+    arr = px.astype(np.float64)
+    if _diffuse_fast is not None:
+        dys, dxs, wts = (np.array(c) for c in zip(*kernel))
+        q = _diffuse_fast(arr, n - 1, dys, dxs, wts.astype(np.float64))
+    else:
+        q = _diffuse_rows(arr, n - 1, kernel)
+    return reps[q]
+
+
+def floyd_steinberg(px, chars=None):
+    return error_diffuse(px, DIFFUSION['floyd'], chars)
+
+
+def ordered_dither(px, chars=None):
+    # Bayer threshold map — no error carried between pixels, so frames stay stable in animation
+    n, reps = _levels(chars)
+    if n < 2: return px
+    h, w = px.shape
+    step = 255 / (n - 1)
+    thr = np.tile(_BAYER, (h // 8 + 1, w // 8 + 1))[:h, :w]
+    q = np.clip(np.floor(px / step + 0.5 + thr), 0, n - 1).astype(np.intp)
+    return reps[q]
+
+
+def apply_dither(px, method, chars=None):
+    if method is True: method = 'floyd'
+    if method == 'bayer': return ordered_dither(px, chars)
+    if method in DIFFUSION: return error_diffuse(px, DIFFUSION[method], chars)
+    return px
+
+
+# structure matching — every glyph is rasterized once and box-filtered to a coverage grid;
+# each cell is sampled on the same grid and takes the glyph whose grid is nearest
+FEATURE_COLS, FEATURE_ROWS = 4, 7
+_FEATURE_CACHE = _Memo(32)
+
+def glyph_features(chars, fnt=None):
+    # (n, FEATURE_ROWS*FEATURE_COLS) coverage vectors and their squared norms, per font + charset
+    fnt = fnt or load_font(16)
+    key = (fnt, ''.join(chars))
+    def make():
+        cw, ch = measure_font(fnt)
+        grids = []
+        for g in key[1]:
+            m = Image.new('L', (cw, ch), 0)
+            ImageDraw.Draw(m).text((0, 0), g, font=fnt, fill=255)
+            grids.append(np.asarray(m.resize((FEATURE_COLS, FEATURE_ROWS), Image.Resampling.BOX), np.float32))
+        f = np.stack(grids).reshape(len(grids), -1) / 255
+        f /= max(f.mean(axis=1).max(), 1e-6)   # the densest glyph stands in for full brightness
+        return f, (f * f).sum(axis=1)
+    return _FEATURE_CACHE.get(key, make)
+
+
+def match_glyphs(gpx, chars, fnt=None):
+    # gpx holds FEATURE_ROWS × FEATURE_COLS luminance samples per cell. nearest glyph by L2 distance,
+    # argmin |g|² - 2 x·g, as one matrix multiply per block of cells
+    f, f2 = glyph_features(chars, fnt)
+    rows, width = gpx.shape[0] // FEATURE_ROWS, gpx.shape[1] // FEATURE_COLS
+    x = gpx.reshape(rows, FEATURE_ROWS, width, FEATURE_COLS).transpose(0, 2, 1, 3)
+    x = x.reshape(rows * width, -1).astype(np.float32) / 255
+    idx = np.empty(len(x), np.intp)
+    for i in range(0, len(x), 1 << 14):   # bounds the (cells, glyphs) distance block
+        idx[i:i + (1 << 14)] = np.argmin(f2 - 2 * (x[i:i + (1 << 14)] @ f.T), axis=1)
+    return idx.reshape(rows, width).astype(np.uint8 if len(f) <= 256 else np.uint16)
+
+
+# palette budget — bounds the number of distinct colors (Tk tags / CSS styles) per image
+PALETTES = ['off', '16', '64', '256', 'median 16', 'median 64', 'median 256']
+_FIXED_LEVELS = {16: (2, 4, 2), 64: (4, 4, 4), 256: (8, 8, 4)}
+
+
+def _unpack_rgb(key):
+    key = key.astype(np.uint32)
+    return np.stack([key >> 16, key >> 8 & 255, key & 255], axis=-1).astype(np.uint8)
+
+
+def _median_cut(px, n):
+    # adaptive palette: keep splitting the widest box of distinct colors at its pixel-weighted median.
+    # returns the palette and, for every pixel, the index of the box it ended up in
+    uniq, inv, counts = np.unique(pack_rgb(px).ravel(), return_inverse=True, return_counts=True)
+    cols = _unpack_rgb(uniq).astype(np.int32)
+    boxes = [np.arange(len(cols))]
+    spans = [np.ptp(cols, axis=0)]
+    widest = [int(spans[0].max())]
+    while len(boxes) < n:
+        i = int(np.argmax(widest))
+        if widest[i] == 0: break
+        box, sp = boxes.pop(i), spans.pop(i); widest.pop(i)
+        order = box[np.argsort(cols[box, sp.argmax()], kind='stable')]
+        cum = np.cumsum(counts[order])
+        cut = min(max(int(np.searchsorted(cum, cum[-1] / 2)) + 1, 1), len(order) - 1)
+        for part in (order[:cut], order[cut:]):
+            boxes.append(part); spans.append(np.ptp(cols[part], axis=0)); widest.append(int(spans[-1].max()))
+    label = np.empty(len(cols), np.intp)
+    for k, b in enumerate(boxes): label[b] = k
+    pal = np.rint([np.average(cols[b], axis=0, weights=counts[b]) for b in boxes]).astype(np.uint8)
+    return pal, label[inv.reshape(-1)]
+
+
+def median_cut(px, n):
+    return _median_cut(px, n)[0]
+
+
+def nearest_colors(px, pal):
+    # maps each distinct color once, in chunks, to its nearest palette entry
+    uniq, inv = np.unique(pack_rgb(px), return_inverse=True)
+    cols = _unpack_rgb(uniq).astype(np.int32)
+    pal = np.asarray(pal, dtype=np.int32)
+    best = np.empty(len(cols), np.intp)
+    for s in range(0, len(cols), 4096):
+        d = ((cols[s:s+4096, None, :] - pal[None]) ** 2).sum(-1)
+        best[s:s+4096] = d.argmin(1)
+    return pal.astype(np.uint8)[best][inv.reshape(-1)].reshape(px.shape)
+
+
+def quantize_colors(px, palette):
+    # palette is an entry of PALETTES or a (K, 3) array, e.g. one median_cut shared by all GIF frames
+    if palette is None or isinstance(palette, str) and palette == 'off':
+        return px
+    if isinstance(palette, str):
+        kind, _, size = palette.rpartition(' ')
+        if kind == 'median':
+            pal, label = _median_cut(px, int(size))
+            return pal[label].reshape(px.shape)
+        else:
+            out = np.empty_like(px)
+            for c, lv in enumerate(_FIXED_LEVELS[int(size)]):
+                lut = np.rint(np.rint(np.arange(256) * (lv - 1) / 255) * 255 / (lv - 1)).astype(np.uint8)
+                out[..., c] = lut[px[..., c]]
+            return out
+    return nearest_colors(px, palette)
+
+
+def shared_palette(img, args, palette):
+    # one median-cut palette for a whole GIF, from the converted colors of its first frame
+    if not isinstance(palette, str) or not palette.startswith('median'):
+        return palette
+    f = convert_frame(img, *args)
+    if f.fg is None: return palette
+    px = f.fg if f.bg is None else np.concatenate([f.fg, f.bg])
+    return median_cut(px, int(palette.split()[1]))
+
+
+class Cancelled(Exception):
+    # raise from a prog_cb to abandon a conversion at its next checkpoint
+    pass
+
+
+class StageCache:
+    # bounded LRU of intermediate pipeline arrays (read-only), keyed by each stage's own inputs
+    def __init__(self, max_bytes=256 << 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._d
+
+    def get(self, key, make):
+        with self._lock:
+            arr = self._d.get(key)
+            if arr is not None:
+                self._d.move_to_end(key); self.hits += 1
+                return arr
+            self.misses += 1
+        arr = make()
+        self.put(key, arr)
+        return arr
+
+    def put(self, key, arr):
+        arr.flags.writeable = False
+        with self._lock:
+            if key in self._d: return
+            self._d[key] = arr
+            self.nbytes += arr.nbytes
+            while self.nbytes > self.max_bytes and len(self._d) > 1:
+                self.nbytes -= self._d.popitem(last=False)[1].nbytes
+
+    def peek(self, key):
+        return self._d.get(key)
+
+    def items(self):
+        with self._lock:
+            return list(self._d.items())
+
+
+EDGE_FILTERS = {'soft': ImageFilter.SMOOTH, 'hard': ImageFilter.SHARPEN, 'find': ImageFilter.FIND_EDGES}
+
+
+# LANCZOS coefficients reproduced operation for operation from Pillow's Resample.c
+# (precompute_coeffs + normalize_coeffs_8bpc), so any block of output cells can be
+# recomputed bit-exactly without resizing the whole frame
+_COEFF_CACHE = _Memo(256)
+
+def _sinc(x):
+    if x == 0.0: return 1.0
+    x = x * math.pi
+    return math.sin(x) / x
+
+
+def _lanczos(x):
+    return _sinc(x) * _sinc(x / 3) if -3.0 <= x < 3.0 else 0.0
+
+
+def resample_coeffs(n_in, n_out):
+    # per output cell: first source index, window length and 22-bit fixed-point weights
+    return _COEFF_CACHE.get((n_in, n_out), lambda: _resample_coeffs(n_in, n_out))
+
+
+def _resample_coeffs(n_in, n_out):
+    scale = filterscale = n_in / n_out
+    if filterscale < 1.0: filterscale = 1.0
+    support = 3.0 * filterscale
+    ss = 1.0 / filterscale
+    first = np.empty(n_out, np.intp)
+    count = np.empty(n_out, np.intp)
+    k = np.zeros((n_out, int(math.ceil(support)) * 2 + 1), np.int64)
+    for xx in range(n_out):
+        center = (xx + 0.5) * scale
+        xmin = max(int(center - support + 0.5), 0)
+        n = min(int(center + support + 0.5), n_in) - xmin
+        ws, ww = [], 0.0
+        for x in range(n):   # summed in order, as in C
+            w = _lanczos((x + xmin - center + 0.5) * ss)
+            ws.append(w); ww += w
+        if ww != 0.0: ws = [w / ww for w in ws]
+        k[xx, :n] = [int(-0.5 + w * (1 << 22)) if w < 0 else int(0.5 + w * (1 << 22)) for w in ws]
+        first[xx], count[xx] = xmin, n
+    return first, count, k
+
+
+def _resample_axis(a, coeffs, lo, hi, axis, offset):
+    # output cells lo:hi along axis of a uint8 (h, w, 3) array whose index 0 is source index `offset`
+    first, _, k = coeffs
+    idx = np.minimum(first[lo:hi, None] - offset + np.arange(k.shape[1]), a.shape[axis] - 1)
+    if axis == 1:
+        acc = np.einsum('rnkc,nk->rnc', a[:, idx].astype(np.int64), k[lo:hi])
+    else:
+        acc = np.einsum('nkwc,nk->nwc', a[idx].astype(np.int64), k[lo:hi])
+    return np.clip((acc + (1 << 21)) >> 22, 0, 255).astype(np.uint8)
+
+
+def _cells(coeffs, lo, hi):
+    # the output cells whose window reads any source index in [lo, hi)
+    first, count, _ = coeffs
+    return int(np.searchsorted(first + count, lo, 'right')), int(np.searchsorted(first, hi, 'left'))
+
+
+def _resize_delta(img, out, prev_img, prev_px):
+    # prev_px is prev_img through the resize stage with the same settings. only the cells whose
+    # window covers a pixel that differs from prev_img are recomputed; None when that's most of them
+    if img.mode != 'RGB' or prev_img.mode != 'RGB' or img.size != prev_img.size: return None
+    box = ImageChops.difference(img, prev_img).getbbox()
+    if box is None: return prev_px
+    (W, H), (w, h) = img.size, out
+    cx, cy = resample_coeffs(W, w), resample_coeffs(H, h)
+    c0, c1 = _cells(cx, box[0], box[2]) if w != W else (box[0], box[2])
+    r0, r1 = _cells(cy, box[1], box[3]) if h != H else (box[1], box[3])
+    if (c1 - c0) * (r1 - r0) * 4 > w * h: return None
+    x0, x1 = (cx[0][c0], (cx[0][c0:c1] + cx[1][c0:c1]).max()) if w != W else (c0, c1)
+    y0, y1 = (cy[0][r0], (cy[0][r0:r1] + cy[1][r0:r1]).max()) if h != H else (r0, r1)
+    patch = np.asarray(img.crop((x0, y0, x1, y1)))
+    # same pass order as Pillow: horizontal first, rounded to uint8, then vertical
+    if w != W: patch = _resample_axis(patch, cx, c0, c1, 1, x0)
+    if h != H: patch = _resample_axis(patch, cy, r0, r1, 0, y0)
+    px = prev_px.copy()
+    px[r0:r1, c0:c1] = patch
+    return px
+
+
+_IDENTITY = np.arange(256, dtype=np.float32)
+
+
+def _blend_lut(base, factor, lut=_IDENTITY):
+    # Image.blend(solid base, img, factor) per input level: the same float32 lerp, clipped and truncated
+    return np.floor(np.clip(np.float32(base) + np.float32(factor) * (lut - np.float32(base)), 0, 255))
+
+
+def tone_planes(px, saturation=1.0, brightness=1.0, contrast=1.0):
+    # what ImageEnhance Color -> Brightness -> Contrast do, in fewer passes: brightness and contrast
+    # are per-level maps, so they fold into one lookup table applied in a single point(); only
+    # saturation, which mixes channels, needs a blend. the results are identical.
+    # returns (h, w, 4) uint8: the adjusted RGB planes plus their L plane
+    im = Image.fromarray(px)
+    if saturation != 1.0: im = Image.blend(im.convert('L').convert('RGB'), im, saturation)
+    lut = _blend_lut(0, brightness) if brightness != 1.0 else _IDENTITY
+    if contrast != 1.0:
+        # the contrast pivot is the mean L after brightness, as ImageEnhance.Contrast measures it
+        if brightness != 1.0: im = im.point(lut.astype(np.uint8).tolist() * 3); lut = _IDENTITY
+        hist = np.array(im.convert('L').histogram())
+        lut = _blend_lut(int(hist @ np.arange(256) / max(hist.sum(), 1) + 0.5), contrast, lut)
+    if lut is not _IDENTITY: im = im.point(lut.astype(np.uint8).tolist() * 3)
+    im.putalpha(im.convert('L'))   # pillow keeps RGB pixels 4 bytes wide, so L fills the spare one
+    return np.asarray(im)
+
+
+def stage_keys(key, size, mode, width, saturation, edge, brightness, contrast):
+    # cache keys of the resize, saturation, edge and tone stages; each one extends the key of the stage it reads
+    aspect = size[1] / size[0]
+    if mode == 'halfblock':
+        raw_h = max(2, int(width * aspect))
+        out = (width, raw_h + raw_h % 2)
+        edge = 'off'
+    else:
+        rows = max(1, int(width * aspect * 0.55))
+        if mode.startswith('braille'): out = (width * 2, rows * 4)
+        elif mode.startswith('structure'): out = (width * FEATURE_COLS, rows * FEATURE_ROWS)
+        else: out = (width, rows)
+    resize = (key, 'resize', out)
+    saturated = (resize, saturation)
+    filtered = (saturated, edge if edge in EDGE_FILTERS else 'off')
+    return resize, saturated, filtered, (filtered, brightness, contrast)
+
+
+@profiled('convert_frame')
+def convert_frame(img, mode, width, chars, brightness, contrast, saturation, invert, dither, edge,
+                  palette=None, prog_cb=None, cache=None, key=None, prev=None):
+    # stages: resize -> saturation -> edge filter -> brightness/contrast -> mode-specific mapping.
+    # everything after the resize works on output-sized arrays, so a huge img costs one pass.
+    # with a StageCache and a key identifying img, each of the first four is reused whenever its
+    # own inputs are unchanged, so e.g. a charset or invert change only redoes the mapping.
+    # prev = (prev_img, its resized array) lets the resize stage redo only what changed since then
+    memo = cache.get if cache is not None and key is not None else (lambda k, make: make())
+    k_resize, k_sat, k_edge, k_tone = stage_keys(key, img.size, mode, width, saturation, edge, brightness, contrast)
+
+    def resize():
+        if prev is not None:
+            px = _resize_delta(img, k_resize[2], *prev)
+            if px is not None: return px
+        src = img if img.mode == 'RGB' else img.convert('RGB')
+        return np.array(src.resize(k_resize[2], Image.Resampling.LANCZOS))
+    with PROFILE.stage('convert_frame.resize'):
+        px = memo(k_resize, resize)
+    if prog_cb: prog_cb(40)
+
+    # saturation runs in the tone pass, except ahead of an edge filter, which has to see it first
+    sat = saturation
+    if k_edge[1] != 'off':
+        if saturation != 1.0:
+            with PROFILE.stage('convert_frame.saturation'):
+                px = memo(k_sat, lambda: np.ascontiguousarray(tone_planes(px, saturation)[..., :3]))
+        with PROFILE.stage('convert_frame.edge'):
+            px = memo(k_edge, lambda: np.array(Image.fromarray(px).filter(EDGE_FILTERS[k_edge[1]])))
+        sat = 1.0
+
+    with PROFILE.stage('convert_frame.tone'):
+        planes = memo(k_tone, lambda: tone_planes(px, sat, brightness, contrast))
+    toned, gpx = planes[..., :3], np.ascontiguousarray(planes[..., 3])
+    if prog_cb: prog_cb(70)
+
+    with PROFILE.stage('convert_frame.map'):
+        if mode == 'halfblock':
+            px = toned
+            if invert: px = 255 - px
+            px = np.ascontiguousarray(quantize_colors(px, palette))   # frames don't keep the L plane alive
+            # each text row covers two pixel rows: top pixel -> fg, bottom pixel -> bg
+            planes = px.reshape(px.shape[0] // 2, 2, width, 3)
+            if prog_cb: prog_cb(100)
+            return ConvertedFrame(mode, HALF_BLOCK, np.zeros(planes.shape[:1] + (width,), np.uint8),
+                                  planes[:, 0], planes[:, 1])
+
+        if mode.startswith('braille'):
+            # 2×4 pixels per cell: threshold (or dither to two levels) and pack the lit dots into one byte.
+            # the result is an ordinary color/grayscale frame over the BRAILLE table,
+            # so every exporter takes it
+            if invert: gpx = 255 - gpx
+            rows = gpx.shape[0] // 4
+            lit = (apply_dither(gpx, dither) >= 128).reshape(rows, 4, width, 2)
+            bits = np.bitwise_or.reduce(lit.astype(np.uint8) << _BRAILLE_BITS[:, None, :], axis=(1, 3))
+            if mode == 'braille mono':
+                if prog_cb: prog_cb(100)
+                return ConvertedFrame('grayscale', BRAILLE, bits)
+            # cell color: the average of its lit dots (of all 8 when none is lit)
+            cpx = 255 - toned if invert else toned
+            blk = cpx.reshape(rows, 4, width, 2, 3).astype(np.float32)
+            m = lit[..., None]
+            n = m.sum(axis=(1, 3))
+            avg = np.where(n > 0, (blk * m).sum(axis=(1, 3)) / np.maximum(n, 1), blk.mean(axis=(1, 3)))
+            cpx = quantize_colors(np.rint(avg).astype(np.uint8), palette)
+            if prog_cb: prog_cb(100)
+            return ConvertedFrame('color', BRAILLE, bits, cpx)
+
+        if mode.startswith('structure'):
+            # glyphs picked by shape, not just tone; color is the mean of each cell's samples
+            if invert: gpx = 255 - gpx
+            idx = match_glyphs(gpx, chars)
+            if mode == 'structure mono':
+                if prog_cb: prog_cb(100)
+                return ConvertedFrame('grayscale', chars, idx)
+            cpx = 255 - toned if invert else toned
+            avg = cpx.reshape(idx.shape[0], FEATURE_ROWS, width, FEATURE_COLS, 3).mean(axis=(1, 3))
+            cpx = quantize_colors(np.rint(avg).astype(np.uint8), palette)
+            if prog_cb: prog_cb(100)
+            return ConvertedFrame('color', chars, idx, cpx)
+
+        if mode == 'grayscale':
+            if invert: gpx = 255 - gpx
+            if dither: gpx = apply_dither(gpx, dither, chars)
+            if prog_cb: prog_cb(100)
+            return ConvertedFrame(mode, chars, glyph_indices(gpx, chars))
+
+        # color mode
+        cpx = toned
+        if invert:
+            cpx = 255 - cpx
+            gpx = 255 - gpx
+        cpx = np.ascontiguousarray(quantize_colors(cpx, palette))
+        if prog_cb: prog_cb(100)
+        return ConvertedFrame(mode, chars, glyph_indices(gpx, chars), cpx)
+
+
+def frame_runs(frame):
+    # per row, (text, palette index) for each run of adjacent cells sharing a color
+    cols, inv = frame.palette()
+    h, w = inv.shape
+    rows = [[] for _ in range(h)]
+    if not inv.size: return cols, rows
+    flat = inv.ravel()
+    brk = np.ones(flat.size, bool)
+    brk[1:] = flat[1:] != flat[:-1]
+    brk[::w] = True
+    starts = np.flatnonzero(brk)
+    text = ''.join(frame.lines())
+    ends = starts[1:].tolist() + [flat.size]
+    for s, e, k in zip(starts.tolist(), ends, flat[starts].tolist()):
+        rows[s // w].append((text[s:e], k))
+    return cols, rows
+
+
+def _resize_key(key, img, args):
+    # the resize stage key convert_frame(img, *args, key=key) uses
+    return stage_keys(key, img.size, args[0], args[1], args[5], args[8], args[3], args[4])[0]
+
+
+def _frame_digest(img):
+    return img.size, img.mode, hashlib.sha256(img.tobytes()).digest()
+
+
+def _convert_seq(frames, args, cache, key, dedup=True):
+    # converts (index, img) pairs in order, yielding one ConvertedFrame each. identical frames
+    # share one result, and each frame only re-resizes the cells it changed since the last one
+    seen, prev = {}, None
+    for i, img in frames:
+        if dedup:
+            d = _frame_digest(img)
+            if d in seen:
+                yield seen[d]; continue
+        f = convert_frame(img, *args, cache=cache, key=(key, i), prev=prev)
+        if dedup: seen[d] = f
+        px = cache.peek(_resize_key((key, i), img, args))
+        prev = None if px is None else (img, px)
+        yield f
+
+
+def _convert_job(job):
+    # a run of consecutive frames; with a key the worker also sends back each frame's resize
+    # array, the one stage a re-conversion with other tone settings can start from. the later
+    # stages would cost pickling several times the results for little reuse
+    run, args, key = job
+    local = StageCache()
+    frames = [(i, Image.frombytes('RGB', size, data)) for i, size, data in run]
+    out = list(_convert_seq(frames, args, local, 'job' if key is None else key, dedup=False))
+    return out, ([] if key is None else [(k, a) for k, a in local.items() if k[1] == 'resize'])
+
+
+def _pool_context():
+    # workers come from a fork server (started with asciiconverter already imported) where the
+    # platform has one: forking the threaded GUI directly could copy a lock another thread holds,
+    # like PROFILE.lock mid-summary, into a child that then waits on it forever
+    if 'forkserver' not in multiprocessing.get_all_start_methods(): return None
+    ctx = multiprocessing.get_context('forkserver')
+    ctx.set_forkserver_preload(['asciiconverter'])
+    return ctx
+
+
+def _pool_init():
+    # stages timed in a worker never reach the parent's profile
+    PROFILE.enable(False)
+
+
+RUN_FRAMES = 8          # frames per pool job; within a job each frame reuses the previous one's resize
+RUN_BYTES = 8 << 20
+
+
+@profiled('convert_frames')
+def convert_frames(frames, args, workers=1, prog_cb=None, cancel=None, cache=None, key=None):
+    # converts an iterable of frames in order; args are convert_frame's params after img.
+    # identical frames are converted once, and a frame that differs from the previous one only
+    # in a region re-resizes just the cells that region touches; results match a full conversion.
+    # with workers > 1 runs of consecutive frames go to a process pool as raw RGB bytes, at most
+    # 2 per worker in flight. frame i is cached under (key, i); frames whose resize stage is already
+    # cached are converted right here instead. returns None if `cancel` (a threading.Event) gets set
+    if cache is None or key is None:
+        cache, key, keep = StageCache(64 << 20), 'seq', False
+    else:
+        keep = True
+    out = []
+    def done(f):
+        out.append(f)
+        if prog_cb: prog_cb(len(out))
+    if workers <= 1:
+        for f in _convert_seq(enumerate(frames), args, cache, key):
+            if cancel and cancel.is_set(): return None
+            done(f)
+        return out
+    with ProcessPoolExecutor(workers, mp_context=_pool_context(), initializer=_pool_init) as pool:
+        # entries: a Future for a run, an int for a repeat of that earlier frame, or a ConvertedFrame
+        pending, run, seen = deque(), [], {}
+        # resize arrays are only asked back while they fit in half the cache; past that, for long
+        # gifs, they'd just evict each other
+        budget = cache.max_bytes // 2 if keep else 0
+        def flush():
+            nonlocal budget
+            if run:
+                w, h = stage_keys(None, run[0][1], args[0], args[1], args[5], args[8], args[3], args[4])[0][2]
+                need = w * h * 3 * len(run)
+                send = need <= budget
+                if send: budget -= need
+                pending.append(pool.submit(_convert_job, (run[:], args, key if send else None)))
+                run.clear()
+        def collect():
+            e = pending.popleft()
+            if isinstance(e, int): return done(out[e])
+            if not isinstance(e, Future): return done(e)
+            fs, stages = e.result()
+            for k, arr in stages: cache.put(k, arr)
+            for f in fs: done(f)
+        for i, img in enumerate(frames):
+            if cancel and cancel.is_set(): break
+            img = img.convert('RGB')
+            d = _frame_digest(img)
+            if d in seen:
+                flush(); pending.append(seen[d])
+            elif keep and _resize_key((key, i), img, args) in cache:
+                flush(); pending.append(convert_frame(img, *args, cache=cache, key=(key, i)))
+            else:
+                run.append((i, img.size, img.tobytes()))
+                if len(run) >= RUN_FRAMES or sum(len(r[2]) for r in run) >= RUN_BYTES: flush()
+            seen.setdefault(d, i)
+            while sum(isinstance(e, Future) for e in pending) >= workers * 2:
+                collect()
+        flush()
+        while pending and not (cancel and cancel.is_set()):
+            collect()
+        if cancel and cancel.is_set():
+            for e in pending:
+                if isinstance(e, Future): e.cancel()
+            return None
+    return out
+
+
+CACHE_VERSION = 2
+
+
+def default_cache_dir():
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'asciiconverter')
+
+
+def file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DiskCache:
+    # content-addressed store of converted results: one .npz per (source digest, parameters).
+    # a hit refreshes the file's mtime, and the oldest files go first once over max_bytes
+    def __init__(self, root=None, max_bytes=512 << 20):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        os.makedirs(self.root, exist_ok=True)
+        self.nbytes = sum(e.stat().st_size for e in os.scandir(self.root) if e.name.endswith('.npz'))
+
+    @staticmethod
+    def key(digest, args, palette='off'):
+        # args are convert_frame's params from mode to edge
+        mode, width, chars, brightness, contrast, saturation, invert, dither, edge = args
+        p = (CACHE_VERSION, digest, mode, width, ''.join(chars), brightness, contrast, saturation,
+             bool(invert), dither, edge, palette)
+        return hashlib.blake2b(repr(p).encode(), digest_size=16).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + '.npz')
+
+    def _size(self, path):
+        try: return os.path.getsize(path)
+        except OSError: return 0
+
+    def get(self, key):
+        # returns (frames, durations) or None
+        path = self._path(key)
+        try:
+            with np.load(path) as z:
+                mode, chars = str(z['mode']), str(z['chars'])
+                fg, bg = (z['fg'] if 'fg' in z else None), (z['bg'] if 'bg' in z else None)
+                frames = [ConvertedFrame(mode, chars, idx, None if fg is None else fg[i],
+                                         None if bg is None else bg[i]) for i, idx in enumerate(z['idx'])]
+                durations = z['durations'].tolist()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # truncated or otherwise unreadable (BadZipFile, EOFError, ...): drop it so it gets rewritten
+            size = self._size(path)
+            try:
+                os.remove(path)
+                self.nbytes -= size
+            except OSError:
+                pass
+            self.misses += 1
+            return None
+        self.hits += 1
+        return frames, durations
+
+    def put(self, key, frames, durations=()):
+        f0 = frames[0]
+        arrays = dict(mode=np.array(f0.mode), chars=np.array(f0.chars),
+                      idx=np.stack([f.idx for f in frames]), durations=np.array(durations, np.int32))
+        if f0.fg is not None: arrays['fg'] = np.stack([f.fg for f in frames])
+        if f0.bg is not None: arrays['bg'] = np.stack([f.bg for f in frames])
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as fh:
+            np.savez(fh, **arrays)
+        old = self._size(path)
+        os.replace(tmp, path)   # atomic, so concurrent batch workers never see half a file
+        self.nbytes += os.path.getsize(path) - old
+        if self.nbytes > self.max_bytes: self.evict()
+
+    def evict(self):
+        entries = []
+        for e in os.scandir(self.root):
+            if e.name.endswith('.npz'):
+                try: st = e.stat()
+                except OSError: continue
+                entries.append((st.st_mtime, st.st_size, e.path))
+        entries.sort()
+        self.nbytes = sum(e[1] for e in entries)
+        for _, size, path in entries:
+            if self.nbytes <= self.max_bytes: break
+            try: os.remove(path)
+            except OSError: continue
+            self.nbytes -= size
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = f"{self.hits / total:.0%}" if total else '—'
+        return f"cache {rate} hit  {self.nbytes / (1 << 20):.1f} MB"
+
+
+@profiled('frame_to_html')
+def frame_to_html(frame):
+    def esc(c): return c.replace('&','&amp;').replace('<','&lt;').replace('>','&gt;')
+    if frame.mode == 'grayscale':
+        return '\n'.join(esc(line) for line in frame.lines())
+    cols, inv = frame.palette()
+    lines = []
+    if frame.mode == 'color':
+        opens = [f'<span style="color:{col}">' for col in cols]
+        for line, krow in zip(frame.lines(), inv.tolist()):
+            lines.append(''.join(f'{opens[k]}{esc(ch)}</span>' for ch, k in zip(line, krow)))
+    elif frame.mode == 'halfblock':
+        spans = [f'<span style="color:{fg};background:{bg}">{HALF_BLOCK}</span>' for fg, bg in cols]
+        for krow in inv.tolist():
+            lines.append(''.join(spans[k] for k in krow))
+    return '\n'.join(lines)
+
+
+@profiled('make_static_html')
+def make_static_html(frame, fontsize=10, bg='#000000'):
+    body = frame_to_html(frame)
+    return f'''<!DOCTYPE html><html><head><meta charset="utf-8"><title>ASCII Art</title>
+<style>body{{background:{bg};margin:0;padding:16px}}
+pre{{font-family:"Courier New",monospace;font-size:{fontsize}px;line-height:1.2;margin:0}}
+span{{display:inline}}</style></head><body><pre>{body}</pre></body></html>'''
+
+
+def _player_html(title, data_js, draw_js, durations, fontsize, bg, css=''):
+    # page + playback bar shared by the animated exports; data_js must define N (frame count),
+    # draw_js is the body of draw(i), which puts frame i into #out
+    ddata = json.dumps(durations)
+    return f'''<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body{{background:{bg};margin:0;padding:16px;user-select:none}}
+pre{{font-family:"Courier New",monospace;font-size:{fontsize}px;line-height:1.2;margin:0;white-space:pre}}
+span{{display:inline}}
+#bar{{position:fixed;bottom:10px;left:50%;transform:translateX(-50%);
+      background:rgba(0,0,0,.8);border-radius:8px;padding:6px 14px;
+      display:flex;gap:10px;align-items:center;color:#00ff88;font-family:monospace;font-size:13px}}
+button{{background:#1e1e1e;color:#00ff88;border:1px solid #333;border-radius:4px;
+        padding:2px 9px;cursor:pointer;font-size:13px}}
+button:hover{{background:#2a2a2a}}
+input[type=range]{{accent-color:#00ff88}}
+{css}
+</style></head><body>
+<pre id="out"></pre>
+<div id="bar">
+  <button id="btn">⏸</button>
+  frame <input type="range" id="scrub" min="0" value="0" style="width:150px">
+  <span id="info">1/1</span>
+  speed <input type="range" id="spd" min="10" max="400" value="100" style="width:80px">
+  <span id="sl">100%</span>
+</div>
+<script>
+{data_js}
+const dur={ddata};
+const out=document.getElementById('out'), btn=document.getElementById('btn'),
+      scrub=document.getElementById('scrub'), info=document.getElementById('info'),
+      spd=document.getElementById('spd'), sl=document.getElementById('sl');
+const draw=i=>{{ {draw_js} }};
+scrub.max=N-1;
+let idx=0, playing=true, t=null;
+const show=i=>{{ draw(i); scrub.value=i; info.textContent=(i+1)+'/'+N; }};
+const next=()=>{{ idx=(idx+1)%N; show(idx); t=setTimeout(next, Math.max(16, dur[idx]*(100/+spd.value))); }};
+btn.onclick=()=>{{ playing=!playing; btn.textContent=playing?'⏸':'▶'; playing?next():clearTimeout(t); }};
+scrub.oninput=()=>{{ clearTimeout(t); idx=+scrub.value; show(idx); if(playing) next(); }};
+spd.oninput=()=>sl.textContent=spd.value+'%';
+show(0); next();
+</script></body></html>'''
+
+
+@profiled('make_animated_html')
+def make_animated_html(frames, durations, fontsize=10, bg='#000000'):
+    # one pre-rendered html string per frame — simple but large; see make_compact_html
+    fdata = json.dumps([frame_to_html(f) for f in frames])
+    return _player_html('ASCII GIF', f'const frames={fdata}, N=frames.length;',
+                        'out.innerHTML=frames[i];', durations, fontsize, bg)
+
+
+def _b64(a):
+    return base64.b64encode(np.ascontiguousarray(a).tobytes()).decode('ascii')
+
+
+def _uint_for(n):
+    return '<u1' if n <= 1 << 8 else '<u2' if n <= 1 << 16 else '<u4'
+
+
+@profiled('make_compact_html')
+def make_compact_html(frames, durations, fontsize=10, bg='#000000', keyframe_every=50):
+    # colors become a shared set of CSS classes; every frame is stored as base64 typed arrays of
+    # glyph and class indices, holding only the cells that changed since the previous frame
+    # (as (start, length) runs). the player keeps the current cell state and rebuilds the <pre>
+    def esc(c): return c.replace('&','&amp;').replace('<','&lt;').replace('>','&gt;')
+    f0 = frames[0]
+    h, w = f0.idx.shape
+    gt = _uint_for(len(f0.chars))
+    css, keys, pt = '', None, '<u1'
+    if f0.fg is not None:
+        keys = [f.color_keys().ravel() for f in frames]
+        uniq = np.unique(np.concatenate([np.unique(k) for k in keys]))
+        pt = _uint_for(len(uniq))
+        if f0.bg is None:
+            rules = [f'color:#{v:06x}' for v in uniq.tolist()]
+        else:
+            rules = [f'color:#{v >> 24:06x};background:#{v & 0xffffff:06x}' for v in uniq.tolist()]
+        css = '\n'.join(f'.c{np.base_repr(k, 36).lower()}{{{r}}}' for k, r in enumerate(rules))
+
+    enc, prev = [], None
+    for i, f in enumerate(frames):
+        g = f.idx.ravel().astype(gt)
+        p = np.searchsorted(uniq, keys[i]).astype(pt) if keys else None
+        full = prev is None or i % keyframe_every == 0
+        if not full:
+            changed = g != prev[0]
+            if p is not None: changed |= p != prev[1]
+            full = changed.mean() > 0.5
+        if full:
+            runs, g_out, p_out = np.array([0, g.size]), g, p
+        else:
+            edges = np.diff(np.concatenate([[0], changed.view(np.int8), [0]]))
+            starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+            runs = np.stack([starts, ends - starts], 1).ravel()
+            g_out, p_out = g[changed], p[changed] if p is not None else None
+        enc.append([_b64(runs.astype('<u4')), _b64(g_out), _b64(p_out) if p is not None else '', int(full)])
+        prev = (g, p)
+
+    arr = {'<u1': 'Uint8Array', '<u2': 'Uint16Array', '<u4': 'Uint32Array'}
+    data_js = (f"const W={w}, H={h}, GL={json.dumps([esc(c) for c in f0.chars])}, "
+               f"GT={arr[gt]}, PT={arr[pt]}, COLOR={'true' if keys else 'false'},\n"
+               f"      frames={json.dumps(enc, separators=(',', ':'))}, N=frames.length;\n"
+               """const dec=(s,T)=>{ const b=atob(s), u=new Uint8Array(b.length);
+  for(let i=0;i<b.length;i++) u[i]=b.charCodeAt(i); return new T(u.buffer); };
+const G=new GT(W*H), P=new PT(W*H); let cur=-1;
+const apply=i=>{ const f=frames[i], r=dec(f[0],Uint32Array), g=dec(f[1],GT), p=COLOR?dec(f[2],PT):null;
+  for(let k=0,j=0;k<r.length;k+=2) for(let x=r[k],e=x+r[k+1];x<e;x++,j++){ G[x]=g[j]; if(p) P[x]=p[j]; }
+  cur=i; };
+const seek=i=>{ let k=i; while(!frames[k][3]) k--;
+  let j=(cur>=k && cur<=i) ? cur+1 : k; for(;j<=i;j++) apply(j); };
+const html=()=>{ let s='';
+  for(let y=0;y<H;y++){ let x=y*W; const end=x+W;
+    while(x<end){ const k=P[x]; let t=''; do{ t+=GL[G[x]]; x++; }while(x<end && (!COLOR || P[x]===k));
+      s+=COLOR ? '<span class=c'+k.toString(36)+'>'+t+'</span>' : t; }
+    if(y<H-1) s+='\\n'; }
+  return s; };""")
+    return _player_html('ASCII GIF', data_js, 'seek(i); out.innerHTML=html();', durations, fontsize, bg, css)
+
+
+_FONT_CACHE = {}
+_ATLAS_CACHE = _Memo(16)
+
+# ansi — SGR colors are only emitted when they differ from the cell before, and animations are
+# streamed as cursor-positioned runs of the cells that changed since the last frame drawn
+ANSI_DEPTHS = ['24bit', '256']
+ANSI_RESET = '\x1b[0m'
+_XTERM_LEVELS = np.array([0, 95, 135, 175, 215, 255])
+ANSI_CHUNK = 1 << 16   # bytes handed to the terminal per write while streaming
+
+
+def ansi256(rgb):
+    # nearest xterm-256 color for each uint8 RGB triple: the 6x6x6 cube or the gray ramp, whichever is closer
+    c = rgb.astype(np.int32)
+    q = np.searchsorted([48, 115, 155, 195, 235], c, side='right')
+    cube = _XTERM_LEVELS[q]
+    g = np.clip((c.sum(axis=-1) // 3 - 3) // 10, 0, 23)
+    gray = 8 + 10 * g
+    d_cube = ((c - cube) ** 2).sum(axis=-1)
+    d_gray = ((c - gray[..., None]) ** 2).sum(axis=-1)
+    return np.where(d_gray < d_cube, 232 + g, 16 + 36 * q[..., 0] + 6 * q[..., 1] + q[..., 2]).astype(np.uint8)
+
+
+def _ansi_planes(frame, depth):
+    # (sgr prefix, per-cell key, key -> sgr params) for each color plane the frame has
+    planes = []
+    for rgb, base in ((frame.fg, 38), (frame.bg, 48)):
+        if rgb is None: continue
+        if depth == '256':
+            planes.append((base, ansi256(rgb), lambda k, b=base: f'{b};5;{k}'))
+        else:
+            planes.append((base, pack_rgb(rgb),
+                           lambda k, b=base: f'{b};2;{k >> 16};{k >> 8 & 255};{k & 255}'))
+    return planes
+
+
+def _ansi_spans(lines, planes, spans, state):
+    # spans are (row, start, end, move) runs to draw; state holds the colors the terminal is set
+    # to and is updated, so consecutive runs only re-send the planes that changed
+    out = []
+    for y, a, b, move in spans:
+        if move: out.append(f'\x1b[{y + 1};{a + 1}H')
+        line = lines[y]
+        if not planes:
+            out.append(line[a:b])
+            continue
+        keys = [k[y, a:b] for _, k, _ in planes]
+        brk = np.logical_or.reduce([k[1:] != k[:-1] for k in keys])
+        starts = [0] + (np.flatnonzero(brk) + 1).tolist()
+        firsts = [k[starts].tolist() for k in keys]
+        for j, (s, e) in enumerate(zip(starts, starts[1:] + [b - a])):
+            sgr = []
+            for i, (_, _, fmt) in enumerate(planes):
+                k = firsts[i][j]
+                if state[i] != k:
+                    state[i] = k
+                    sgr.append(fmt(k))
+            out.append((f'\x1b[{";".join(sgr)}m' if sgr else '') + line[a + s:a + e])
+    return out
+
+
+@profiled('frame_to_ansi')
+def frame_to_ansi(frame, depth='24bit'):
+    # the frame as text with SGR colors; each line ends with a reset so backgrounds don't bleed
+    lines = frame.lines()
+    if frame.mode == 'grayscale': return '\n'.join(lines)
+    planes = _ansi_planes(frame, depth)
+    rows = []
+    for y in range(len(lines)):
+        state = [None] * len(planes)
+        rows.append(''.join(_ansi_spans(lines, planes, [(y, 0, frame.width, False)], state)) + ANSI_RESET)
+    return '\n'.join(rows)
+
+
+def ansi_delta(prev, frame, depth='24bit', state=None):
+    # escapes that turn a terminal showing prev into frame: a full redraw from the top-left
+    # corner when there is no prev (or its shape differs), otherwise only the changed runs
+    state = state if state is not None else [None, None]
+    if prev is None or prev.idx.shape != frame.idx.shape or prev.mode != frame.mode:
+        state[:] = [None, None]
+        return '\x1b[H' + frame_to_ansi(frame, depth).replace('\n', '\x1b[K\n') + '\x1b[K'
+    diff = prev.idx != frame.idx
+    for a, b in ((prev.fg, frame.fg), (prev.bg, frame.bg)):
+        if b is not None: diff |= (a != b).any(axis=-1)
+    if not diff.any(): return ''
+    brk = np.zeros((diff.shape[0], diff.shape[1] + 2), np.int8)
+    brk[:, 1:-1] = diff
+    ys, xs = np.nonzero(np.diff(brk, axis=1))
+    ys, xs = ys.reshape(-1, 2)[:, 0].tolist(), xs.reshape(-1, 2).tolist()
+    spans = [(y, a, b, True) for y, (a, b) in zip(ys, xs)]
+    planes = _ansi_planes(frame, depth) if frame.mode != 'grayscale' else []
+    return ''.join(_ansi_spans(frame.lines(), planes, spans, state))
+
+
+def ansi_stream(frames, depth='24bit'):
+    # an animation as one escape stream (no timing): the first frame in full, then deltas
+    prev, state = None, [None, None]
+    for f in frames:
+        yield ansi_delta(prev, f, depth, state)
+        prev = f
+
+
+def play_ansi(frames, durations, out=None, depth='24bit', loop=False, speed=1.0):
+    # streams frames to a terminal at their own timing. a frame is only built when it is due, so
+    # nothing queues up ahead of a slow link; frames whose slot has passed are skipped and the
+    # next delta is taken from the last frame actually drawn
+    out = out or sys.stdout.buffer
+    def write(s):
+        data = s.encode('utf-8')
+        for i in range(0, len(data), ANSI_CHUNK):
+            out.write(data[i:i + ANSI_CHUNK])
+        out.flush()
+    secs = lambda i: max(16, (durations[i] if durations else 100) / speed) / 1000
+    write('\x1b[?25l\x1b[2J')
+    prev, state, i, n = None, [None, None], 0, len(frames)
+    due = time.perf_counter()
+    try:
+        while True:
+            now = time.perf_counter()
+            if now - due > 1.0: due = now
+            while due + secs(i) <= now and (i + 1 < n or loop):
+                due += secs(i)
+                i = (i + 1) % n
+            write(ansi_delta(prev, frames[i], depth, state))
+            prev = frames[i]
+            due += secs(i)
+            if i + 1 >= n and not loop: break
+            i = (i + 1) % n
+            time.sleep(max(0.0, due - time.perf_counter()))
+    finally:
+        write(ANSI_RESET + '\x1b[?25h\n')
+
+
+def load_font(size):
+    # cached so glyph atlases keyed on the font object survive between exports
+    sz = max(8, size)
+    fnt = _FONT_CACHE.get(sz)
+    if fnt is None:
+        for name in ("cour.ttf", "DejaVuSansMono.ttf", "LiberationMono-Regular.ttf"):
+            try: fnt = ImageFont.truetype(name, sz); break
+            except: pass
+        else:
+            fnt = ImageFont.load_default()
+        _FONT_CACHE[sz] = fnt
+    return fnt
+
+
+def measure_font(fnt):
+    d = ImageDraw.Draw(Image.new('RGB', (80, 80)))
+    bb = d.textbbox((0,0), 'X', font=fnt)
+    return bb[2]-bb[0]+1, bb[3]-bb[1]+2
+
+
+def _is_braille(c):
+    return '\u2800' <= c <= '\u28ff'
+
+
+def _draw_braille(m, g, cw, ch):
+    # dots drawn straight from the pattern's bits: the usual monospace fonts have no braille glyphs
+    bits = ord(g) - 0x2800
+    r = max(1.0, min(cw / 2, ch / 4) * 0.35)
+    draw = ImageDraw.Draw(m)
+    for (row, col), bit in np.ndenumerate(_BRAILLE_BITS):
+        if bits >> bit & 1:
+            x, y = cw + cw * (2 * col + 1) / 4, ch + ch * (2 * row + 1) / 8
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=255)
+
+
+def glyph_atlas(fnt, cw, ch, chars):
+    # every glyph rasterized once, exactly as draw.text puts it in a cell, into a 3×3-cell mask
+    # centred on its own cell so ink spilling into neighbours is kept: shape (n, 3, 3, ch, cw)
+    key = (fnt, cw, ch, ''.join(chars))
+    def make():
+        masks = []
+        for g in key[3]:
+            m = Image.new('L', (3 * cw, 3 * ch), 0)
+            if _is_braille(g): _draw_braille(m, g, cw, ch)
+            else: ImageDraw.Draw(m).text((cw, ch), g, font=fnt, fill=255)
+            masks.append(np.array(m))
+        atlas = np.stack(masks).reshape(-1, 3, ch, 3, cw).transpose(0, 1, 3, 2, 4)
+        return atlas.astype(np.uint16)
+    return _ATLAS_CACHE.get(key, make)
+
+
+# offsets of a source cell relative to the cell it paints into, in draw.text's row-major order
+_SPILL_ORDER = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+def _div255(a):
+    # Pillow's DIV255 rounding, so composed cells match draw.text byte for byte
+    t = a + 128
+    return ((t >> 8) + t) >> 8
+
+
+@profiled('rows_to_image')
+def rows_to_image(frame, fnt, cw, ch):
+    ncols = frame.width or 1
+    fg = frame.fg
+    if frame.mode == 'grayscale':
+        # white glyphs through the atlas, one per cw-wide cell like the color modes, rather than
+        # draw.text per row at the font's own advance
+        fg = np.broadcast_to(np.uint8(255), frame.idx.shape + (3,))
+    # color: glyph mask × fg; halfblock: ▀ mask blends fg over the cell's bg. each pass blends
+    # one neighbour offset for every cell at once, in the same order draw.text would have; rows
+    # are composed in bands to bound the (rows, cols, ch, cw, 3) temporaries. uint16 is enough:
+    # a*(255-m) + b*m never exceeds 255*255
+    h, w = frame.idx.shape
+    atlas = glyph_atlas(fnt, cw, ch, frame.chars)
+    inked = atlas.any(axis=(0, 3, 4))
+    out = np.zeros((h * ch, ncols * cw, 3), np.uint8)
+    for y0 in range(0, h, 16):
+        y1 = min(h, y0 + 16)
+        cells = np.zeros((y1 - y0, w, ch, cw, 3), np.uint16)
+        if frame.bg is not None:
+            cells[:] = frame.bg[y0:y1, :, None, None, :]
+        for sr, sc in _SPILL_ORDER:
+            if frame.bg is not None and (sr, sc) < (0, 0): continue   # painted over by the bg rectangle
+            if not inked[1 - sr, 1 - sc]: continue
+            t0, t1 = max(y0, -sr), min(y1, h - sr)
+            c0, c1 = max(0, -sc), min(w, w - sc)
+            if t0 >= t1 or c0 >= c1: continue
+            m = atlas[frame.idx[t0+sr:t1+sr, c0+sc:c1+sc], 1 - sr, 1 - sc][..., None]
+            col = fg[t0+sr:t1+sr, c0+sc:c1+sc, None, None, :].astype(np.uint16)
+            tgt = cells[t0-y0:t1-y0, c0:c1]
+            tgt[:] = _div255(tgt * (255 - m) + col * m)
+        out[y0*ch:y1*ch, :w*cw] = cells.transpose(0, 2, 1, 3, 4).reshape((y1 - y0) * ch, w * cw, 3)
+    return Image.fromarray(out)
+
+
+# headless batch conversion — python -m asciiconverter in/*.gif --mode color --width 160 --format html
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tiff')
+
+
+def expand_inputs(patterns):
+    # files, glob patterns (for shells that don't expand them) and directories, deduplicated in order
+    paths = []
+    for p in patterns:
+        if os.path.isdir(p):
+            found = sorted(os.path.join(p, f) for f in os.listdir(p) if f.lower().endswith(IMAGE_EXTS))
+        else:
+            found = sorted(glob.glob(p)) or [p]
+        for f in found:
+            if f not in paths: paths.append(f)
+    return paths
+
+
+def output_paths(path, fmt, out_dir=None, nframes=1):
+    base = os.path.splitext(os.path.basename(path))[0]
+    d = out_dir or os.path.dirname(path)
+    if fmt == 'png' and nframes > 1:
+        return [os.path.join(d, f"{base}_{i:04d}.png") for i in range(nframes)]
+    return [os.path.join(d, f"{base}.{'ans' if fmt == 'ansi' else fmt}")]
+
+
+def settings_key(args, palette, fmt, fontsize, depth):
+    # hash of everything besides the source that decides what convert_file writes
+    extra = (fmt, fontsize if fmt in ('png', 'html') else None, depth if fmt == 'ansi' else None)
+    return DiskCache.key(extra, args, palette)
+
+
+def settings_path(outs):
+    # sidecar holding the settings_key the outputs were written with, hidden next to the first one
+    d, name = os.path.split(outs[0])
+    return os.path.join(d, f".{name}.settings")
+
+
+def up_to_date(path, outs, key=None):
+    # outputs newer than the source, and written with the same settings when a key is given
+    t = os.path.getmtime(path)
+    if not all(os.path.exists(o) and os.path.getmtime(o) >= t for o in outs): return False
+    if key is None: return True
+    try:
+        with open(settings_path(outs)) as fh: return fh.read().strip() == key
+    except OSError:
+        return False
+
+
+def frame_count(path):
+    # frames a conversion of path yields: every frame of an animated gif, one for anything else
+    if not path.lower().endswith('.gif'): return 1
+    with Image.open(path) as im:
+        return getattr(im, 'n_frames', 1)
+
+
+def load_converted(path, args, palette='off', workers=1, cache_dir=None):
+    # the converted frames and gif durations for path, from a DiskCache in cache_dir when it has them
+    animated = frame_count(path) > 1
+    cache = DiskCache(cache_dir) if cache_dir else None
+    key = cache and DiskCache.key(file_digest(path), args, palette)
+    hit = cache and cache.get(key)
+    if hit: return hit
+    if animated:
+        first = next(extract_gif_frames(path))[0]
+        args = args + (shared_palette(first, args, palette),)
+        durations = []
+        def frames():
+            for f, dur in extract_gif_frames(path):
+                durations.append(dur)
+                yield f
+        converted = convert_frames(frames(), args, workers)
+    else:
+        converted, durations = [convert_frame(open_image(path), *args, palette)], []
+    if cache: cache.put(key, converted, durations)
+    return converted, durations
+
+
+def convert_file(path, args, palette='off', fmt='txt', out_dir=None, fontsize=9, workers=1, force=False,
+                 cache_dir=None, depth='24bit'):
+    # args are convert_frame's params from mode to edge. returns the written paths, [] if up to date.
+    # with a cache_dir, results are looked up in (and added to) a DiskCache there before converting
+    nf = frame_count(path)
+    animated = nf > 1
+    outs = output_paths(path, fmt, out_dir, nf)
+    key = settings_key(args, palette, fmt, fontsize, depth)
+    if not force and up_to_date(path, outs, key): return []
+    converted, durations = load_converted(path, args, palette, workers, cache_dir)
+
+    if out_dir: os.makedirs(out_dir, exist_ok=True)
+    _write_outputs(converted, durations, animated, outs, fmt, fontsize, depth)
+    with open(settings_path(outs), 'w') as fh:   # last, so an interrupted run is never taken as current
+        fh.write(key)
+    return outs
+
+
+def _write_outputs(converted, durations, animated, outs, fmt, fontsize, depth):
+    if fmt == 'png':
+        fnt = load_font(fontsize); cw, ch = measure_font(fnt)
+        for f, o in zip(converted, outs):
+            rows_to_image(f, fnt, cw, ch).save(o)
+        return
+    if fmt == 'html':
+        data = (make_compact_html(converted, durations, fontsize=fontsize) if animated
+                else make_static_html(converted[0], fontsize=fontsize))
+    elif fmt == 'ansi':
+        data = (''.join(ansi_stream(converted, depth)) + ANSI_RESET if animated
+                else frame_to_ansi(converted[0], depth) + '\n')
+    else:
+        data = '\n\n'.join(f.text() for f in converted)
+    with open(outs[0], 'w', encoding='utf-8') as fh:
+        fh.write(data)
+
+
+def _convert_file_job(job):
+    path, kw = job
+    try:
+        return path, convert_file(path, **kw), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='asciiconverter',
+                                 description="Convert images and GIFs to ASCII art without the GUI.")
+    ap.add_argument('inputs', nargs='+', help="files, glob patterns or directories")
+    ap.add_argument('-m', '--mode', choices=MODES, default='color')
+    ap.add_argument('-w', '--width', type=int, default=120)
+    ap.add_argument('--charset', choices=list(CHARS), default='Standard')
+    ap.add_argument('--chars', default='', help="custom characters, overrides --charset")
+    ap.add_argument('--brightness', type=float, default=1.0)
+    ap.add_argument('--contrast', type=float, default=1.1)
+    ap.add_argument('--saturation', type=float, default=1.2)
+    ap.add_argument('--invert', action='store_true')
+    ap.add_argument('--dither', choices=DITHERS, default='off')
+    ap.add_argument('--edge', choices=['off', 'soft', 'hard', 'find'], default='off')
+    ap.add_argument('--palette', choices=PALETTES, default='off')
+    ap.add_argument('-f', '--format', choices=['txt', 'html', 'png', 'ansi'], default='txt')
+    ap.add_argument('--color-depth', choices=ANSI_DEPTHS, default='24bit', help="colors used by ansi output")
+    ap.add_argument('--play', action='store_true',
+                    help="stream the result to the terminal instead of writing files (gifs play at their own timing)")
+    ap.add_argument('--loop', action='store_true', help="with --play, loop gifs until interrupted")
+    ap.add_argument('-o', '--out', help="output directory (default: next to each input)")
+    ap.add_argument('--fontsize', type=int, default=9, help="font size for png and html")
+    ap.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('--force', action='store_true', help="convert even if the outputs are newer than the input")
+    ap.add_argument('--cache-dir', default=default_cache_dir(), help="where converted results are cached")
+    ap.add_argument('--no-cache', action='store_true', help="don't read or write the conversion cache")
+    ap.add_argument('--profile', metavar='PATH',
+                    help="write per-stage timings here (stages in -j worker processes aren't included)")
+    ap.add_argument('--profile-format', choices=['trace', 'json'], default='trace',
+                    help="chrome trace (chrome://tracing, ui.perfetto.dev) or a per-stage json summary")
+    opts = ap.parse_args(argv)
+    PROFILE.enable(bool(opts.profile))
+
+    chars = list(opts.chars.strip()) or CHARS[opts.charset]
+    args = (opts.mode, opts.width, chars, opts.brightness, opts.contrast, opts.saturation,
+            opts.invert, opts.dither, opts.edge)
+    paths = expand_inputs(opts.inputs)
+    kw = dict(args=args, palette=opts.palette, fmt=opts.format, out_dir=opts.out,
+              fontsize=opts.fontsize, force=opts.force, cache_dir=None if opts.no_cache else opts.cache_dir)
+    workers = max(1, opts.workers)
+
+    if opts.play:
+        try:
+            for p in paths:
+                frames, durations = load_converted(p, args, opts.palette, workers, kw['cache_dir'])
+                play_ansi(frames, durations, depth=opts.color_depth, loop=opts.loop)
+        except KeyboardInterrupt:
+            pass
+        if opts.profile: PROFILE.dump(opts.profile, opts.profile_format)
+        return 0
+    kw['depth'] = opts.color_depth
+
+    # one input: spend the workers on its frames. several: one input per worker
+    if len(paths) == 1:
+        jobs = [(paths[0], dict(kw, workers=workers))]
+    else:
+        jobs = [(p, kw) for p in paths]
+
+    failed = 0
+    def report(results):
+        nonlocal failed
+        for path, outs, err in results:
+            if err:
+                failed += 1
+                print(f"{path}: error: {err}", file=sys.stderr)
+            elif not outs:
+                print(f"{path}: up to date")
+            else:
+                print(f"{path} -> {outs[0]}" + (f" (+{len(outs)-1} more)" if len(outs) > 1 else ''))
+    if len(jobs) == 1 or workers == 1:
+        report(map(_convert_file_job, jobs))
+    else:
+        with ProcessPoolExecutor(workers, mp_context=_pool_context(), initializer=_pool_init) as pool:
+            report(pool.map(_convert_file_job, jobs))
+    if opts.profile: PROFILE.dump(opts.profile, opts.profile_format)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
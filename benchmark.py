@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import PIL
+from PIL import Image, ImageDraw, ImageFilter
+
+import asciiconverter as ac
+
+
+# benchmarks for the conversion and export hot paths. fixtures are generated from fixed seeds, so
+# two runs on the same machine time the same work; results go to json and can be checked against
+# a stored baseline. timings only compare on one machine, so no baseline is kept in the repo:
+# record one before a change and compare after it
+#   python benchmark.py -o base.json
+#   python benchmark.py --baseline base.json --threshold 0.15
+WIDTHS = [60, 120, 240]
+BASE_ARGS = dict(brightness=1.0, contrast=1.1, saturation=1.2, invert=False)
+USES_CHARS = {'color', 'grayscale', 'structure', 'structure mono'}
+USES_DITHER = {'grayscale', 'braille', 'braille mono'}
+USES_EDGE = set(ac.MODES) - {'halfblock'}
+EDGES = ['off', 'soft', 'hard', 'find']
+
+
+# fixtures
+def gradient(size=(640, 480)):
+    w, h = size
+    x = np.linspace(0, 255, w)[None, :].repeat(h, 0)
+    y = np.linspace(0, 255, h)[:, None].repeat(w, 1)
+    return Image.fromarray(np.dstack([x, y, 255 - x]).astype(np.uint8))
+
+
+def noise_photo(size=(640, 480), seed=1):
+    # blurred noise over a gradient with a few hard-edged shapes: smooth areas, texture and edges
+    rng = np.random.default_rng(seed)
+    n = Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+    img = Image.blend(gradient(size), n.filter(ImageFilter.GaussianBlur(3)), 0.5)
+    d = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.integers(0, size[0]), rng.integers(0, size[1])
+        r = int(rng.integers(10, 60))
+        d.ellipse([x - r, y - r, x + r, y + r], fill=tuple(int(v) for v in rng.integers(0, 256, 3)))
+    return img
+
+
+def write_gif(path, disposal, n=24, size=(320, 240), seed=2):
+    # a sprite moving over a still background, so dedup and the delta resize both get exercised
+    rng = np.random.default_rng(seed)
+    bg = noise_photo(size, seed)
+    frames = []
+    for i in range(n):
+        f = bg.copy()
+        x = i * (size[0] - 40) // n
+        ImageDraw.Draw(f).rectangle([x, 80, x + 40, 120], fill=tuple(int(v) for v in rng.integers(0, 256, 3)))
+        frames.append(f)
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=40, disposal=disposal, loop=0)
+    return path
+
+
+# timing
+def measure(fn, repeat, mem=True):
+    fn()   # warm-up: fills the lut/coefficient/feature caches a long-running app would already have
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    res = {'median_ms': round(statistics.median(times), 3), 'min_ms': round(min(times), 3)}
+    if mem:
+        # separate run: tracemalloc slows allocation-heavy code down too much to time under it
+        tracemalloc.start()
+        fn()
+        res['peak_kb'] = tracemalloc.get_traced_memory()[1] >> 10
+        tracemalloc.stop()
+    return res
+
+
+def convert_cases(img, name):
+    for width in WIDTHS:
+        for mode in ac.MODES:
+            for cs in (ac.CHARS if mode in USES_CHARS else ['Standard']):
+                for dither in (ac.DITHERS if mode in USES_DITHER else ['off']):
+                    for edge in (EDGES if mode in USES_EDGE else ['off']):
+                        args = (mode, width, ac.CHARS[cs], BASE_ARGS['brightness'], BASE_ARGS['contrast'],
+                                BASE_ARGS['saturation'], BASE_ARGS['invert'], dither, edge)
+                        yield (f"convert_frame/{name}/{mode}/{cs}/{dither}/{edge}/w{width}",
+                               lambda a=args: ac.convert_frame(img, *a))
+
+
+def export_cases(img, gif_path):
+    for mode in ('color', 'halfblock', 'grayscale'):
+        f = ac.convert_frame(img, mode, 160, ac.CHARS['Standard'], 1.0, 1.1, 1.2, False, 'off', 'off')
+        yield f"frame_to_html/{mode}", lambda f=f: ac.frame_to_html(f)
+        yield f"frame_to_ansi/{mode}", lambda f=f: ac.frame_to_ansi(f)
+        fnt = ac.load_font(9); cw, ch = ac.measure_font(fnt)
+        yield f"rows_to_image/{mode}", lambda f=f: ac.rows_to_image(f, fnt, cw, ch)
+    px = np.asarray(img.convert('L').resize((240, 120)), np.uint8)
+    yield "floyd_steinberg/240x120", lambda: ac.floyd_steinberg(px, ac.CHARS['Standard'])
+    frames, durations = ac.load_converted(gif_path, ('color', 120, ac.CHARS['Standard'], 1.0, 1.1, 1.2,
+                                                     False, 'off', 'off'))
+    yield "make_animated_html/24f", lambda: ac.make_animated_html(frames, durations)
+    yield "make_compact_html/24f", lambda: ac.make_compact_html(frames, durations)
+
+
+def gif_cases(paths):
+    args = ('color', 120, ac.CHARS['Standard'], 1.0, 1.1, 1.2, False, 'off', 'off', None)
+    for disposal, path in paths.items():
+        yield f"extract_gif_frames/disposal{disposal}", lambda p=path: list(ac.extract_gif_frames(p))
+        yield (f"convert_frames/disposal{disposal}",
+               lambda p=path: ac.convert_frames((f for f, _ in ac.extract_gif_frames(p)), args))
+
+
+# tk
+def start_xvfb():
+    # a private virtual display for the tk benchmarks when there is no real one. with -displayfd
+    # Xvfb picks a free display number itself and writes it to the pipe once it accepts clients
+    if os.environ.get('DISPLAY') or not shutil.which('Xvfb'): return None
+    r, w = os.pipe()
+    proc = subprocess.Popen(['Xvfb', '-displayfd', str(w), '-screen', '0', '1600x1000x24', '-nolisten', 'tcp'],
+                            pass_fds=(w,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(w)
+    with os.fdopen(r) as fh:
+        num = fh.readline().strip()
+    if not num:   # it exited without starting
+        proc.wait()
+        return None
+    os.environ['DISPLAY'] = ':' + num
+    return proc
+
+
+def tk_cases(img):
+    import tkinter as tk
+    import Conervert
+    root = tk.Tk()
+    root.geometry('1400x900')
+    app = Conervert.App(root)
+    root.update()
+    for mode in ('color', 'halfblock', 'grayscale'):
+        for width in (120, 240):
+            f = ac.convert_frame(img, mode, width, ac.CHARS['Standard'], 1.0, 1.1, 1.2, False, 'off', 'off')
+            def show(f=f):
+                app.shown = None
+                app._show(f)
+                root.update()
+            yield f"_show/{mode}/w{width}", show
+    root.destroy()
+
+
+def compare(results, baseline, threshold):
+    # cases at least threshold slower (by median) than in the baseline; tiny cases are noise
+    slower = []
+    for name, base in baseline['results'].items():
+        cur = results.get(name)
+        if not cur or base['median_ms'] < 0.5: continue
+        ratio = cur['median_ms'] / base['median_ms']
+        if ratio > 1 + threshold: slower.append((name, base['median_ms'], cur['median_ms'], ratio))
+    return slower
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Time the conversion and export hot paths.")
+    ap.add_argument('-k', '--filter', default='', help="only run cases whose name matches this regex")
+    ap.add_argument('-r', '--repeat', type=int, default=3, help="timed runs per case (the median is kept)")
+    ap.add_argument('-o', '--out', help="write results as json here")
+    ap.add_argument('--baseline', help="json from an earlier run to compare against")
+    ap.add_argument('--threshold', type=float, default=0.15,
+                    help="fail when a case is this much slower than the baseline (0.15 = 15%%)")
+    ap.add_argument('--no-mem', action='store_true', help="skip the peak memory runs")
+    ap.add_argument('--tk', action='store_true', help="also time _show; starts Xvfb if there is no display")
+    opts = ap.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='asciibench-')
+    xvfb = start_xvfb() if opts.tk else None
+    try:
+        photo = noise_photo()
+        gifs = {d: write_gif(os.path.join(tmp, f"d{d}.gif"), d) for d in (0, 1, 2)}
+        groups = [convert_cases(gradient(), 'gradient'), convert_cases(photo, 'photo'),
+                  export_cases(photo, gifs[1]), gif_cases(gifs)]
+        if opts.tk and os.environ.get('DISPLAY'): groups.append(tk_cases(photo))
+        elif opts.tk: print("no display and no Xvfb: skipping the tk cases", file=sys.stderr)
+
+        pat = re.compile(opts.filter)
+        results = {}
+        for group in groups:
+            for name, fn in group:
+                if not pat.search(name): continue
+                results[name] = measure(fn, opts.repeat, not opts.no_mem)
+                r = results[name]
+                print(f"{name:<60} {r['median_ms']:>10.2f} ms" +
+                      (f" {r['peak_kb']:>9} KB" if 'peak_kb' in r else ''), flush=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if xvfb: xvfb.terminate()
+
+    meta = {'python': platform.python_version(), 'numpy': np.__version__, 'pillow': PIL.__version__,
+            'machine': platform.machine(), 'system': platform.system(), 'cpus': os.cpu_count(),
+            'repeat': opts.repeat, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    if opts.out:
+        with open(opts.out, 'w') as fh:
+            json.dump({'meta': meta, 'results': results}, fh, indent=1)
+
+    if opts.baseline:
+        with open(opts.baseline) as fh:
+            slower = compare(results, json.load(fh), opts.threshold)
+        for name, a, b, ratio in sorted(slower, key=lambda s: -s[3]):
+            print(f"SLOWER {name}: {a:.2f} -> {b:.2f} ms ({ratio:.2f}x)", file=sys.stderr)
+        print(f"{len(slower)} case(s) over the {opts.threshold:.0%} threshold")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
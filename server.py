@@ -0,0 +1,367 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from PIL import Image, UnidentifiedImageError
+
+from asciiconverter import (
+    CHARS, MODES, DITHERS, PALETTES, ANSI_DEPTHS, EDGE_FILTERS, ANSI_RESET,
+    FEATURE_ROWS, open_image, extract_gif_frames, stage_keys, convert_frame, convert_frames, shared_palette,
+    make_static_html, make_compact_html, frame_to_ansi, ansi_stream, rows_to_image, load_font, measure_font,
+)
+
+
+# conversion service: POST an image or gif as the request body to /convert with convert_frame's
+# parameters in the query string; GET /metrics for throughput, latency and queue depth.
+#   python server.py -p 8765 -j 4
+#   curl --data-binary @cat.gif 'http://127.0.0.1:8765/convert?mode=halfblock&width=100&format=ansi'
+# conversions run on a process pool started (and warmed) up front. at most workers + queue
+# requests are admitted at once; the rest get 503 with Retry-After instead of piling up
+HOST = '127.0.0.1'
+MAX_UPLOAD = 64 << 20
+MAX_WIDTH = 1000
+MAX_CHARS = 256   # custom charsets; each new one costs every worker a glyph atlas and feature table
+REQUEST_TIMEOUT = 120
+READ_TIMEOUT = 30
+# decoded size caps, checked from the header before any pixel data is decoded. gifs are capped by
+# their logical screen, since every frame is composited at that size
+MAX_PIXELS = 1 << 25
+MAX_GIF_PIXELS = 1 << 22
+# output caps: the row count follows the image's aspect ratio, so a narrow strip at a large width
+# asks for millions of rows. samples are what convert_frame resizes to (several per cell outside
+# color and grayscale); cells are per frame, and summed over a gif's frames; png is rendered pixels
+MAX_SAMPLES = 1 << 24
+MAX_CELLS = 1 << 20
+MAX_GIF_CELLS = 1 << 22
+MAX_PNG_PIXELS = 1 << 26
+WRITE_CHUNK = 1 << 16
+FORMATS = {'txt': 'text/plain; charset=utf-8', 'html': 'text/html; charset=utf-8',
+           'ansi': 'text/plain; charset=utf-8', 'png': 'image/png'}
+
+
+# worker side
+class TooLarge(ValueError):
+    pass
+
+
+def _warm(fontsize):
+    # fills the per-process caches (charset luts, glyph features, fonts and glyph atlases) so the
+    # first real request in each worker doesn't pay for them
+    img = Image.linear_gradient('L').convert('RGB').resize((64, 64))
+    fnt = load_font(fontsize); cw, ch = measure_font(fnt)
+    for name, chars in CHARS.items():
+        for mode in ('color', 'grayscale', 'structure'):
+            rows_to_image(convert_frame(img, mode, 16, chars, 1.0, 1.0, 1.0, False, 'off', 'off'), fnt, cw, ch)
+    for mode in ('halfblock', 'braille'):
+        rows_to_image(convert_frame(img, mode, 16, CHARS['Standard'], 1.0, 1.0, 1.0, False, 'off', 'off'),
+                      fnt, cw, ch)
+
+
+def _ping():
+    return os.getpid()
+
+
+def check_output(size, mode, width, fmt, fontsize, nframes):
+    # raises TooLarge when converting an image of this size would ask for too much
+    out = stage_keys(None, size, mode, width, 1.0, 'off', 1.0, 1.0)[0][2]
+    rows = out[1] // (2 if mode == 'halfblock' else 4 if mode.startswith('braille')
+                      else FEATURE_ROWS if mode.startswith('structure') else 1)
+    cells = width * rows
+    if out[0] * out[1] > MAX_SAMPLES or cells > MAX_CELLS:
+        raise TooLarge(f"{width}x{rows} cells of {mode} is over the output limit")
+    if cells * nframes > MAX_GIF_CELLS:
+        raise TooLarge(f"{nframes} frames of {width}x{rows} cells is over the output limit")
+    if fmt == 'png':
+        cw, ch = measure_font(load_font(fontsize))
+        if cells * cw * ch * nframes > MAX_PNG_PIXELS:
+            raise TooLarge(f"the png would be over {MAX_PNG_PIXELS} pixels; lower the width or fontsize")
+
+
+def render(job):
+    # (image bytes, convert_frame args from mode to edge, palette, format, fontsize, ansi depth)
+    # -> response body. gifs convert every frame and come back animated where the format allows
+    data, args, palette, fmt, fontsize, depth = job
+    with Image.open(io.BytesIO(data)) as im:
+        w, h = im.size
+        cap = MAX_GIF_PIXELS if im.format == 'GIF' else MAX_PIXELS
+        if w * h > cap: raise TooLarge(f"{w}x{h} is over the {cap}-pixel limit")
+        animated = im.format == 'GIF' and getattr(im, 'n_frames', 1) > 1
+        check_output(im.size, args[0], args[1], fmt, fontsize, im.n_frames if animated else 1)
+    if animated:
+        first = next(extract_gif_frames(io.BytesIO(data)))[0]
+        args = args + (shared_palette(first, args, palette),)
+        durations = []
+        def frames():
+            for f, dur in extract_gif_frames(io.BytesIO(data)):
+                durations.append(dur)
+                yield f
+        converted = convert_frames(frames(), args)
+    else:
+        converted, durations = [convert_frame(open_image(io.BytesIO(data)), *args, palette)], []
+
+    if fmt == 'png':
+        # gifs become an animated png; repeated frames are drawn once
+        fnt = load_font(fontsize); cw, ch = measure_font(fnt)
+        drawn = {}
+        imgs = [drawn.get(id(f)) or drawn.setdefault(id(f), rows_to_image(f, fnt, cw, ch)) for f in converted]
+        buf = io.BytesIO()
+        if animated:
+            imgs[0].save(buf, 'PNG', save_all=True, append_images=imgs[1:], duration=durations, loop=0)
+        else:
+            imgs[0].save(buf, 'PNG')
+        return buf.getvalue()
+    if fmt == 'html':
+        text = (make_compact_html(converted, durations, fontsize=fontsize) if animated
+                else make_static_html(converted[0], fontsize=fontsize))
+    elif fmt == 'ansi':
+        text = (''.join(ansi_stream(converted, depth)) + ANSI_RESET if animated
+                else frame_to_ansi(converted[0], depth) + '\n')
+    else:
+        text = '\n\n'.join(f.text() for f in converted)
+    return text.encode('utf-8')
+
+
+def parse_params(query):
+    # query string -> render's job fields after the image; ValueError names the bad parameter
+    q = {k: v[-1] for k, v in parse_qs(query).items()}
+    def pick(name, choices, default):
+        v = q.get(name, default)
+        if v not in choices: raise ValueError(f"{name} must be one of: {', '.join(choices)}")
+        return v
+    def num(name, default, lo, hi, kind=float):
+        try: v = kind(q.get(name, default))
+        except ValueError: raise ValueError(f"{name} must be a number") from None
+        if not lo <= v <= hi: raise ValueError(f"{name} must be between {lo} and {hi}")
+        return v
+    chars = list(q.get('chars', ''))
+    if len(chars) > MAX_CHARS: raise ValueError(f"chars can have at most {MAX_CHARS} characters")
+    chars = chars or CHARS[pick('charset', list(CHARS), 'Standard')]
+    args = (pick('mode', MODES, 'color'), num('width', 120, 1, MAX_WIDTH, int), chars,
+            num('brightness', 1.0, 0, 5), num('contrast', 1.1, 0, 5), num('saturation', 1.2, 0, 5),
+            q.get('invert', '0').lower() in ('1', 'true', 'yes', 'on'),
+            pick('dither', DITHERS, 'off'), pick('edge', ['off'] + list(EDGE_FILTERS), 'off'))
+    return (args, pick('palette', PALETTES, 'off'), pick('format', list(FORMATS), 'txt'),
+            num('fontsize', 9, 4, 48, int), pick('depth', ANSI_DEPTHS, '24bit'))
+
+
+# server side
+class Metrics:
+    def __init__(self, keep=4096):
+        self.t0 = time.time()
+        self.lock = threading.Lock()
+        self.latency = deque(maxlen=keep)   # seconds, most recent completed requests
+        self.finished = deque()             # completion times over the last minute
+        self.counts = dict(accepted=0, completed=0, failed=0, rejected=0)
+        self.in_flight = 0
+
+    def add(self, name, n=1):
+        with self.lock:
+            self.counts[name] += n
+            if name == 'accepted': self.in_flight += n
+
+    def release(self):
+        # the request's work is over: its render finished, or it never got submitted
+        with self.lock:
+            self.in_flight -= 1
+
+    def done(self, seconds, ok):
+        # the response went out; a timed-out render can still be running and stays in flight
+        now = time.time()
+        with self.lock:
+            self.counts['completed' if ok else 'failed'] += 1
+            if ok: self.latency.append(seconds)
+            self.finished.append(now)
+            while self.finished and self.finished[0] < now - 60: self.finished.popleft()
+
+    def snapshot(self, workers, capacity):
+        now = time.time()
+        with self.lock:
+            lat = sorted(self.latency)
+            while self.finished and self.finished[0] < now - 60: self.finished.popleft()
+            window = min(60.0, max(now - self.t0, 1e-3))
+            pct = lambda p: round(lat[min(len(lat) - 1, int(p / 100 * len(lat)))] * 1000, 1) if lat else None
+            return dict(uptime_s=round(now - self.t0, 1), workers=workers, capacity=capacity,
+                        in_flight=self.in_flight, queue_depth=max(0, self.in_flight - workers),
+                        throughput_per_s=round(len(self.finished) / window, 3), **self.counts,
+                        latency_ms=dict(p50=pct(50), p90=pct(90), p99=pct(99),
+                                        max=round(lat[-1] * 1000, 1) if lat else None, samples=len(lat)))
+
+
+class Service:
+    def __init__(self, workers, queue, fontsize=9):
+        self.workers = workers
+        self.capacity = workers + queue
+        self.slots = threading.BoundedSemaphore(self.capacity)
+        self.metrics = Metrics()
+        self.fontsize = fontsize
+        self.lock = threading.Lock()
+        self.pool = self._start_pool()
+
+    def _start_pool(self):
+        # submitting one job per worker makes the executor start them all now, not on demand.
+        # workers come from a fork server started with the first pool, so a pool rebuilt while
+        # serving doesn't inherit the listening socket and open connections
+        ctx = multiprocessing.get_context('forkserver') if 'forkserver' in multiprocessing.get_all_start_methods() else None
+        pool = ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_warm, initargs=(self.fontsize,))
+        for f in [pool.submit(_ping) for _ in range(self.workers)]: f.result()
+        return pool
+
+    def submit(self, job):
+        with self.lock:
+            pool = self.pool
+        try:
+            return pool.submit(render, job)
+        except BrokenProcessPool:
+            # a worker died (out of memory, killed): replace the pool once and retry
+            with self.lock:
+                if self.pool is pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self.pool = self._start_pool()
+                pool = self.pool
+            return pool.submit(render, job)
+
+    def finish(self, _=None):
+        # frees an admission slot once the work behind it is really done, so renders a
+        # timed-out request left running still count against workers + queue
+        self.slots.release()
+        self.metrics.release()
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    service = None   # set by serve()
+    timeout = READ_TIMEOUT   # per socket operation, so a stalled client can't sit on an admitted slot
+
+    def _send(self, code, body, ctype='text/plain; charset=utf-8', headers=()):
+        if isinstance(body, str): body = body.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in headers: self.send_header(k, v)
+        self.end_headers()
+        for i in range(0, len(body), WRITE_CHUNK):
+            self.wfile.write(body[i:i + WRITE_CHUNK])
+
+    def _discard(self, length):
+        # reads and drops a body we're refusing, so the client gets the status instead of a reset
+        while length > 0:
+            chunk = self.rfile.read(min(length, WRITE_CHUNK))
+            if not chunk: break
+            length -= len(chunk)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        svc = self.service
+        if path == '/metrics':
+            self._send(200, json.dumps(svc.metrics.snapshot(svc.workers, svc.capacity), indent=1),
+                       'application/json')
+        elif path == '/':
+            self._send(200, "POST an image or gif body to /convert?mode=&width=&charset=&chars=&brightness="
+                            "&contrast=&saturation=&invert=&dither=&edge=&palette=&format=txt|html|ansi|png"
+                            "&fontsize=&depth=24bit|256\nGET /metrics for counters and latency\n")
+        else:
+            self._send(404, "not found\n")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        svc = self.service
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            self.close_connection = True
+            return self._send(411, "Content-Length required\n")
+        if length < 0:
+            # rfile.read(-1) would buffer the stream to EOF, whatever its size
+            self.close_connection = True
+            return self._send(400, "bad Content-Length\n")
+        if length > MAX_UPLOAD:
+            self.close_connection = True
+            return self._send(413, f"upload over {MAX_UPLOAD >> 20} MB\n")
+        if url.path != '/convert':
+            self._discard(length)
+            return self._send(404, "not found\n")
+        try:
+            params = parse_params(url.query)
+        except ValueError as e:
+            self._discard(length)
+            return self._send(400, f"{e}\n")
+        # admission before the body is buffered: a refused upload is streamed past, never held
+        if not svc.slots.acquire(blocking=False):
+            svc.metrics.add('rejected')
+            self._discard(length)
+            return self._send(503, "busy, retry shortly\n", headers=[('Retry-After', '1')])
+        t = time.perf_counter()
+        svc.metrics.add('accepted')
+        ok, fut = False, None
+        try:
+            data = self.rfile.read(length)
+            fut = svc.submit((data,) + params)
+            fut.add_done_callback(svc.finish)
+            try:
+                body = fut.result(timeout=REQUEST_TIMEOUT)
+            except FutureTimeout:
+                fut.cancel()   # only helps while it's queued; a running render keeps its slot
+                return self._send(504, "conversion timed out\n")
+            except UnidentifiedImageError:
+                return self._send(415, "not an image Pillow can read\n")
+            except (TooLarge, Image.DecompressionBombError) as e:
+                return self._send(413, f"image too large: {e}\n")
+            except Exception as e:
+                return self._send(500, f"conversion failed: {e}\n")
+            self._send(200, body, FORMATS[params[2]])
+            ok = True
+        finally:
+            if fut is None: svc.finish()
+            svc.metrics.done(time.perf_counter() - t, ok)
+
+    def log_message(self, fmt, *args):
+        if not self.server.quiet: super().log_message(fmt, *args)
+
+
+def serve(port, workers, queue, fontsize=9, quiet=False):
+    # the pool starts before any server thread exists
+    svc = Service(workers, queue, fontsize)
+    handler = type('BoundHandler', (Handler,), {'service': svc})
+    httpd = ThreadingHTTPServer((HOST, port), handler)
+    httpd.daemon_threads = True
+    httpd.quiet = quiet
+    # SIGTERM shuts down like ctrl-c, so the workers don't outlive the server
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"serving on http://{HOST}:{httpd.server_port}  ({workers} workers, {queue} queued)", flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        svc.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve conversions over HTTP on localhost.")
+    ap.add_argument('-p', '--port', type=int, default=8765)
+    ap.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('-q', '--queue', type=int, default=16,
+                    help="requests allowed to wait for a worker before new ones get 503")
+    ap.add_argument('--fontsize', type=int, default=9, help="font size the workers warm up for png output")
+    ap.add_argument('--quiet', action='store_true', help="don't log each request")
+    opts = ap.parse_args(argv)
+    serve(opts.port, max(1, opts.workers), max(0, opts.queue), opts.fontsize, opts.quiet)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())